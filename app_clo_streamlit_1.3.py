@@ -3,10 +3,20 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from io import BytesIO
+import hashlib
+import os
+import tempfile
 from scipy import stats
-import matplotlib.pyplot as plt
+import plotly.graph_objects as go
 from datetime import datetime
 from openai import OpenAI
+from clo_pipeline import (
+    COT_TY_LE_AF, LOAI_AF, MAU_AF, XU_LY_THIEU, anh_bieu_do_af, anh_bieu_do_ty_le,
+    doc_file_diem, du_lieu_bieu_do_af, du_lieu_bieu_do_ty_le, gop_file_moi, histogram_cdr,
+    kho_du_lieu_rong, khoa_sinh_vien, kiem_tra_du_lieu, lay_cot_diem, phan_loai_cdr, tao_bao_cao_word,
+    tao_pool_tien_trinh, thong_ke_dat_cdr, tinh_plo,
+)
+from clo_student_reports import ds_phieu_sinh_vien, tao_zip_phieu
 
 
 st.set_page_config(page_title="App đo lường CLO", layout="wide")
@@ -16,22 +26,97 @@ st.title("📘 Ứng dụng đo lường Chuẩn đầu ra học phần (CLO)")
 st.write("Tải lên file điểm (CSV/Excel). File có thể là điểm từng câu hỏi (mỗi cột Q1,Q2...) hoặc điểm tổng và cột phân bố câu hỏi.")
 
 # ----------------- Upload dữ liệu -----------------
-uploaded = st.file_uploader("1) Chọn file CSV/Excel (hỗ trợ .csv, .xls, .xlsx)", type=["csv","xls","xlsx"]) 
+uploaded_files = st.file_uploader(
+    "1) Chọn một hoặc nhiều file CSV/Excel (hỗ trợ .csv, .xls, .xlsx)",
+    type=["csv","xls","xlsx"],
+    accept_multiple_files=True,
+    help="Có thể tải nhiều file (mỗi lớp / mỗi đợt thi một file). Các file sẽ được gộp thành một bộ dữ liệu."
+)
 
-if uploaded is None:
+if not uploaded_files:
     st.info("Vui lòng tải lên file dữ liệu để bắt đầu. Mẫu: MãSV, HoTen, Q1, Q2, ..., Qn hoặc MãSV, HoTen, DiemTong và file mapping Q->CLO.")
     st.stop()
 
-# read file
-try:
-    if uploaded.name.endswith('.csv'):
-        df = pd.read_csv(uploaded)
-    else:
-        df = pd.read_excel(uploaded)
-except Exception as e:
-    st.error(f"Không thể đọc file: {e}")
+# --- Đọc các file mới (song song) và lưu cache theo nội dung từng file ---
+if "file_cache" not in st.session_state:
+    st.session_state.file_cache = {}
+if "kho_du_lieu" not in st.session_state:
+    st.session_state.kho_du_lieu = kho_du_lieu_rong()
+
+ds_file = []
+for f in uploaded_files:
+    noi_dung = f.getvalue()
+    ma_file = hashlib.sha1(noi_dung).hexdigest()
+    if ma_file not in [m for m, _, _ in ds_file]:  # bỏ qua file giống hệt đã chọn
+        ds_file.append((ma_file, f.name, noi_dung))
+
+file_cache = st.session_state.file_cache
+can_doc = [(m, ten, nd) for m, ten, nd in ds_file if m not in file_cache]
+if can_doc:
+    with st.spinner(f"Đang đọc {len(can_doc)} file..."):
+        # openpyxl giữ GIL khi đọc Excel nên các file được đọc song song bằng tiến trình
+        so_tien_trinh = min(4, len(can_doc), os.cpu_count() or 1)
+        ket_qua_doc = {}
+        if so_tien_trinh > 1:
+            with tao_pool_tien_trinh(so_tien_trinh) as pool:
+                futures = {m: pool.submit(doc_file_diem, ten, nd) for m, ten, nd in can_doc}
+                for m, fut in futures.items():
+                    try:
+                        ket_qua_doc[m] = fut.result()
+                    except Exception as e:
+                        ket_qua_doc[m] = e
+        else:
+            for m, ten, nd in can_doc:
+                try:
+                    ket_qua_doc[m] = doc_file_diem(ten, nd)
+                except Exception as e:
+                    ket_qua_doc[m] = e
+        for m, ten, _ in can_doc:
+            df_file = ket_qua_doc[m]
+            if isinstance(df_file, Exception):
+                file_cache[m] = (ten, None, f"Không thể đọc file: {df_file}")
+                continue
+            if 'Tên học phần' not in df_file.columns:
+                file_cache[m] = (ten, None, "Dữ liệu chưa có cột 'Tên học phần'.")
+                continue
+            df_file['File nguồn'] = ten
+            file_cache[m] = (ten, df_file, None)
+
+# Giải phóng cache của các file đã bị gỡ khỏi danh sách tải lên
+ma_hien_tai = [m for m, _, _ in ds_file]
+for m in list(file_cache):
+    if m not in ma_hien_tai:
+        del file_cache[m]
+
+for m in ma_hien_tai:
+    ten, _, loi = file_cache[m]
+    if loi:
+        st.error(f"❌ {ten}: {loi}")
+ma_hop_le = [m for m in ma_hien_tai if file_cache[m][1] is not None]
+
+if not ma_hop_le:
     st.stop()
 
+# --- Gộp tăng dần: chỉ gộp các file mới; gỡ/đổi file thì gộp lại từ cache (không đọc lại) ---
+kho = st.session_state.kho_du_lieu
+if kho['files'] != ma_hop_le[:len(kho['files'])]:
+    kho = kho_du_lieu_rong()
+for m in ma_hop_le[len(kho['files']):]:
+    kho = gop_file_moi(kho, file_cache[m][1], m)
+st.session_state.kho_du_lieu = kho
+
+df = kho['df']
+
+if len(ma_hop_le) > 1:
+    st.success(f"✅ Đã gộp {len(ma_hop_le)} file thành {len(df)} bản ghi sinh viên.")
+
+if kho['trung']:
+    df_trung = pd.concat(kho['trung'], ignore_index=True)
+    so_xung_dot = int(df_trung['Mâu thuẫn điểm'].sum())
+    st.warning(f"⚠️ Phát hiện {len(df_trung)} bản ghi trùng ('Tên học phần', 'IDSV'), trong đó {so_xung_dot} bản ghi có điểm mâu thuẫn. Bản ghi xuất hiện trước được giữ lại.")
+    with st.expander("Xem danh sách bản ghi trùng"):
+        st.dataframe(df_trung, use_container_width=True)
+
 st.subheader("Xem trước dữ liệu")
 st.dataframe(df.head(5))
 
@@ -52,19 +137,8 @@ selected_hocphan = st.selectbox("🎓 Chọn học phần bạn cần đo", hocp
 # --- Lọc dữ liệu theo học phần được chọn ---
 df_hp = df[df['Tên học phần'] == selected_hocphan].copy()
 
-# --- Loại các cột không phải điểm ---
-ignore_cols = ['Tên học phần', 'IDSV', 'Họ và tên SV', 'Lớp', 'Số phách', 'Tổng điểm', 'Mã đề']
-
-# --- Lấy danh sách cột điểm thực sự có dữ liệu ---
-numeric_cols = []
-for c in df_hp.columns:
-    if c not in ignore_cols:
-        try:
-            # Kiểm tra nếu cột có ít nhất một giá trị số (không NaN)
-            if pd.to_numeric(df_hp[c], errors='coerce').notna().sum() > 0:
-                numeric_cols.append(c)
-        except:
-            pass
+# --- Lấy danh sách cột điểm thực sự có dữ liệu (bỏ các cột không phải điểm) ---
+numeric_cols = lay_cot_diem(df_hp)
 
 if len(numeric_cols) == 0:
     st.warning("⚠️ Không tìm thấy cột điểm hợp lệ nào trong dữ liệu học phần này.")
@@ -183,6 +257,12 @@ if cdr_data:
     st.subheader("📋 Tổng hợp thông tin CĐR đã khai báo")
     df_cdr = pd.DataFrame(cdr_data)
     st.dataframe(df_cdr, use_container_width=True)
+
+    # Tên CĐR là khóa của điểm SV theo CĐR và của bảng liên kết PLO nên không được trùng
+    ten_trung = df_cdr.loc[df_cdr["Tên CĐR"].duplicated(), "Tên CĐR"].unique().tolist()
+    if ten_trung:
+        st.error(f"❌ Tên CĐR bị trùng: {', '.join(map(str, ten_trung))}. Vui lòng đặt tên viết tắt khác nhau cho từng CĐR.")
+        st.stop()
     # 👉 Lưu vào session để dùng khi xuất báo cáo
     st.session_state.df_cdr = df_cdr
 
@@ -208,67 +288,79 @@ if cdr_data:
     # Lưu vào session để phần sau dùng được
     st.session_state["cdr_mapping"] = cdr_mapping
 
+# ------------------ KIỂM TRA CHẤT LƯỢNG DỮ LIỆU ĐIỂM ------------------
+st.header("🔎 Kiểm tra chất lượng dữ liệu điểm")
+
+# Khai báo (điểm tối đa, ánh xạ CĐR) của từng học phần được giữ trong phiên để kiểm tra
+# toàn bộ dữ liệu đã tải lên, không chỉ học phần đang chọn
+if "khai_bao_hp" not in st.session_state:
+    st.session_state.khai_bao_hp = {}
+st.session_state.khai_bao_hp[selected_hocphan] = (max_scores, st.session_state.get("cdr_mapping", {}))
+
+# Kết quả kiểm tra được cache theo học phần, bộ dữ liệu đã gộp và khai báo của học phần đó
+if "kiem_tra_cache" not in st.session_state:
+    st.session_state.kiem_tra_cache = {}
+kiem_tra_cache = st.session_state.kiem_tra_cache
+for hp in list(kiem_tra_cache):
+    if hp not in hocphan_list:
+        del kiem_tra_cache[hp]
+
+ds_loi = []
+hp_chua_khai_bao = []
+for hp in hocphan_list:
+    max_hp, cdr_map_hp = st.session_state.khai_bao_hp.get(hp, ({}, {}))
+    if not max_hp:
+        hp_chua_khai_bao.append(hp)
+    khoa_kt = (
+        tuple(kho['files']),
+        tuple(sorted(max_hp.items())),
+        tuple(sorted({q for v in cdr_map_hp.values() for q in v["Câu hỏi"]})),
+    )
+    if hp not in kiem_tra_cache or kiem_tra_cache[hp][0] != khoa_kt:
+        df_kt = df[df['Tên học phần'] == hp]
+        cot_kt = numeric_cols if hp == selected_hocphan else lay_cot_diem(df_kt)
+        # Học phần chưa khai báo điểm tối đa: chưa áp dụng quy tắc vượt điểm tối đa
+        diem_toi_da_kt = {c: max_hp.get(c, np.inf) for c in cot_kt}
+        kiem_tra_cache[hp] = (khoa_kt, *kiem_tra_du_lieu(df_kt, cot_kt, diem_toi_da_kt, cdr_map_hp))
+    ds_loi.append(kiem_tra_cache[hp][2].assign(**{'Tên học phần': hp}))
+
+_, df_diem, _ = kiem_tra_cache[selected_hocphan]
+df_loi = pd.concat(ds_loi, ignore_index=True)
+df_loi = df_loi[['Tên học phần'] + [c for c in df_loi.columns if c != 'Tên học phần']]
+
+if df_loi.empty:
+    st.success(f"✅ Không phát hiện bất thường trong dữ liệu điểm của {len(hocphan_list)} học phần.")
+else:
+    st.warning(f"⚠️ Phát hiện {len(df_loi)} ô điểm bất thường trong dữ liệu đã tải lên.")
+    st.dataframe(df_loi.groupby(['Tên học phần', 'Quy tắc']).size().reset_index(name="Số ô"))
+    with st.expander("Xem chi tiết các ô bất thường"):
+        st.dataframe(df_loi, use_container_width=True)
+    st.download_button(
+        "📥 Tải báo cáo bất thường (CSV)",
+        data=df_loi.to_csv(index=False).encode("utf-8-sig"),
+        file_name="KiemTra_DuLieu.csv",
+        mime="text/csv"
+    )
+if hp_chua_khai_bao:
+    st.caption("Học phần chưa khai báo điểm tối đa (chưa kiểm tra quy tắc vượt điểm tối đa và thiếu điểm theo CĐR): "
+               + ", ".join(map(str, hp_chua_khai_bao)))
+
+# --- Cách xử lý ô điểm bị thiếu (kể cả ô không phải số) trước khi thống kê ---
+xu_ly_thieu = st.radio(
+    "Cách xử lý ô điểm bị thiếu khi thống kê",
+    list(XU_LY_THIEU),
+    format_func=XU_LY_THIEU.get,
+    key=f"xu_ly_thieu_{selected_hocphan}",
+    help="Ô không phải số cũng được xem là thiếu điểm."
+)
+
 # ------------------ PHÂN TÍCH KẾT QUẢ ĐẠT CĐR ------------------
 st.header("📊 Phân tích thống kê kết quả đạt Chuẩn đầu ra (CĐR)")
 
 if 'df_cdr' not in locals() or df_cdr.empty:
     st.warning("⚠️ Chưa có dữ liệu khai báo CĐR để phân tích.")
 else:
-    results = []
-
-    tong_sv = len(df_hp)
-
-    for idx, row in df_cdr.iterrows():
-        cdr_name = row["Tên CĐR"]
-        noi_dung = row["Nội dung"]
-        cauhoi_list = [q.strip() for q in row["Câu hỏi"].split(",") if q.strip() in df_hp.columns]
-
-        if not cauhoi_list:
-            results.append({
-                "CĐR": cdr_name,
-                "Nội dung": noi_dung,
-                "Điểm tối đa CĐR": "-",
-                "Điểm tối thiểu đạt CĐR": "-",
-                "Tổng SV đạt": "-",
-                "Tỷ lệ SV đạt (%)": "-",
-                "Kết quả": "-"
-            })
-            continue
-
-        # 1. Điểm tối đa CĐR = tổng điểm tối đa các câu hỏi
-        diem_toi_da_cdr = sum([max_scores.get(q, 0) for q in cauhoi_list])
-
-        # 2. Điểm tối thiểu đạt CĐR (tính theo % nếu có nhiều câu hỏi)
-        diem_toi_thieu_cdr = row["Điểm tối thiểu"]
-        if len(cauhoi_list) > 1:
-            diem_toi_thieu_cdr = sum([max_scores[q] * (row["Tỷ lệ điểm tối thiểu (%)"] / 100) for q in cauhoi_list])
-
-        # 3. Tổng điểm thực tế sinh viên theo CĐR
-        df_hp["Tổng_" + cdr_name] = df_hp[cauhoi_list].sum(axis=1, skipna=True)
-
-        # 4. Tính số SV đạt và tỷ lệ đạt
-        sv_dat = (df_hp["Tổng_" + cdr_name] >= diem_toi_thieu_cdr).sum()
-        tyle_dat = round((sv_dat / tong_sv) * 100, 2) if tong_sv > 0 else 0
-        
-        # 5. Kết quả đo lường CĐR
-        nhan_xet = "ĐẠT ✅" if tyle_dat >= tile_kyvong else "KHÔNG ĐẠT ❌"
-
-        # Thêm vào danh sách kết quả
-        results.append({
-            "CĐR": cdr_name,
-            "Nội dung": noi_dung,
-            "Điểm tối đa CĐR": round(diem_toi_da_cdr, 2),
-            "Điểm tối thiểu đạt CĐR": round(diem_toi_thieu_cdr, 2),
-            "Tổng SV đạt": int(sv_dat),
-            "Tỷ lệ SV đạt (%)": tyle_dat,
-            "Kết quả": nhan_xet,
-        })
-
-    # Tạo DataFrame kết quả
-    df_thongke = pd.DataFrame(results)
-    df_thongke.index = np.arange(1, len(df_thongke) + 1)
-    df_thongke.reset_index(inplace=True)
-    df_thongke.rename(columns={"index": "TT"}, inplace=True)
+    df_thongke = thong_ke_dat_cdr(df_diem, df_cdr, max_scores, xu_ly_thieu)
 
     st.dataframe(df_thongke, use_container_width=True)
 
@@ -279,60 +371,63 @@ else:
 # ------------------ BIỂU ĐỒ TỶ LỆ SV ĐẠT CĐR ------------------
 st.subheader("📊 Biểu đồ tỷ lệ sinh viên đạt Chuẩn đầu ra (CĐR) so với tỷ lệ kỳ vọng")
 
-try:
-    # Lấy dữ liệu từ bảng thống kê
-    cdr_labels = df_thongke["CĐR"].tolist()
-    ty_le_dat = df_thongke["Tỷ lệ SV đạt (%)"].tolist()
-
-    # Lấy tỷ lệ kỳ vọng từ df_cdr (dựa trên cùng thứ tự CĐR)
-    ty_le_ky_vong = []
-    for cdr in cdr_labels:
-        row = df_cdr[df_cdr["Tên CĐR"] == cdr]
-        if not row.empty:
-            ty_le_ky_vong.append(float(row["Tỷ lệ kỳ vọng (%)"].values[0]))
-        else:
-            ty_le_ky_vong.append(0)
-
-    # Vẽ biểu đồ
-    fig_tyle_cdr, ax = plt.subplots(figsize=(10, 5))
-
-    # Cột tỷ lệ đạt
-    bars = ax.bar(cdr_labels, ty_le_dat, color="#4CAF50", alpha=0.85, label="Tỷ lệ SV đạt (%)")
-
-    # Dòng tỷ lệ kỳ vọng
-    ax.plot(cdr_labels, ty_le_ky_vong, color="orange", marker="o", linewidth=2, label="Tỷ lệ kỳ vọng (%)")
-
-    # Hiển thị giá trị phần trăm trên đầu cột
-    for bar in bars:
-        height = bar.get_height()
-        ax.text(
-            bar.get_x() + bar.get_width() / 2,
-            height + 1,
-            f"{height:.1f}%",
-            ha="center",
-            va="bottom",
-            fontsize=10,
-            fontweight="bold"
-        )
+# Biểu đồ được vẽ ở trình duyệt (plotly) từ dữ liệu đã tổng hợp theo CĐR, không gửi ảnh từ server
+cdr_hien_thi = st.multiselect(
+    "CĐR hiển thị trên biểu đồ",
+    options=df_thongke["CĐR"].astype(str).tolist(),
+    default=df_thongke["CĐR"].astype(str).tolist(),
+    key=f"cdr_hien_thi_{selected_hocphan}"
+)
 
-    # Thiết lập nhãn
-    ax.set_xlabel("Chuẩn đầu ra (CĐR)", fontsize=11)
-    ax.set_ylabel("Tỷ lệ sinh viên đạt (%)", fontsize=11)
-    ax.set_ylim(0, 110)
-    ax.set_title(f"Tỷ lệ sinh viên đạt CĐR – {selected_hocphan}", fontsize=13, fontweight="bold")
 
-    # Di chuyển chú giải ra ngoài để không che dữ liệu
-    ax.legend(loc="upper left", bbox_to_anchor=(1, 1))
-    ax.grid(axis='y', linestyle='--', alpha=0.7)
+def loc_cdr(du_lieu):
+    """Giữ lại các CĐR được chọn hiển thị trong dữ liệu biểu đồ đã tổng hợp."""
+    giu = [i for i, c in enumerate(du_lieu["cdr"]) if c in cdr_hien_thi]
+    return {k: [v[i] for i in giu] for k, v in du_lieu.items()}
 
-    # Hiển thị trên giao diện
-    st.pyplot(fig_tyle_cdr)
 
-    # 👉 Lưu dữ liệu và biểu đồ vào session để xuất Word
-    st.session_state.df_thongke = df_thongke
-    st.session_state.fig_tyle_cdr = fig_tyle_cdr
+try:
+    bd_ty_le = du_lieu_bieu_do_ty_le(df_thongke, df_cdr)
+    d = loc_cdr(bd_ty_le)
+
+    fig_tyle_cdr = go.Figure()
+    fig_tyle_cdr.add_bar(
+        x=d["cdr"], y=d["ty_le_dat"], name="Tỷ lệ SV đạt (%)", marker_color="#4CAF50", opacity=0.85,
+        text=[f"{v:.1f}%" if v is not None else "" for v in d["ty_le_dat"]], textposition="outside",
+        hovertemplate="%{x}: %{y:.2f}%<extra></extra>"
+    )
+    fig_tyle_cdr.add_scatter(
+        x=d["cdr"], y=d["ky_vong"], name="Tỷ lệ kỳ vọng (%)", mode="lines+markers",
+        line=dict(color="orange", width=2), hovertemplate="%{x}: kỳ vọng %{y:.0f}%<extra></extra>"
+    )
+    fig_tyle_cdr.update_layout(
+        title=f"Tỷ lệ sinh viên đạt CĐR – {selected_hocphan}",
+        xaxis_title="Chuẩn đầu ra (CĐR)", yaxis_title="Tỷ lệ sinh viên đạt (%)", yaxis_range=[0, 110]
+    )
+    st.plotly_chart(fig_tyle_cdr, use_container_width=True)
 
-    st.success("✅ Biểu đồ tỷ lệ SV đạt CĐR đã được tạo và lưu thành công!")
+    # 👉 Lưu dữ liệu biểu đồ vào session để xuất Word (ảnh tĩnh chỉ được tạo khi xuất báo cáo)
+    st.session_state.df_thongke = df_thongke
+    st.session_state.bd_ty_le = bd_ty_le
+
+    # --- So sánh tỷ lệ đạt giữa các học phần đã khai báo trong phiên làm việc ---
+    if "bd_ty_le_hp" not in st.session_state:
+        st.session_state.bd_ty_le_hp = {}
+    st.session_state.bd_ty_le_hp[selected_hocphan] = bd_ty_le
+    for hp in list(st.session_state.bd_ty_le_hp):
+        if hp not in hocphan_list:
+            del st.session_state.bd_ty_le_hp[hp]
+
+    if len(st.session_state.bd_ty_le_hp) > 1:
+        with st.expander("So sánh tỷ lệ SV đạt CĐR giữa các học phần"):
+            fig_ss = go.Figure()
+            # Không áp bộ lọc CĐR của học phần đang chọn: tên CĐR của các học phần khác có thể khác
+            for hp, bd in st.session_state.bd_ty_le_hp.items():
+                fig_ss.add_bar(x=bd["cdr"], y=bd["ty_le_dat"], name=hp,
+                               hovertemplate=f"{hp}<br>%{{x}}: %{{y:.2f}}%<extra></extra>")
+            fig_ss.update_layout(barmode="group", xaxis_title="Chuẩn đầu ra (CĐR)",
+                                 yaxis_title="Tỷ lệ sinh viên đạt (%)", yaxis_range=[0, 110])
+            st.plotly_chart(fig_ss, use_container_width=True)
 
 except Exception as e:
     st.error(f"⚠️ Lỗi khi tạo biểu đồ: {e}")
@@ -346,7 +441,7 @@ except Exception as e:
         worksheet.set_column('A:A', 5)   # TT
         worksheet.set_column('B:B', 10)  # CĐR
         worksheet.set_column('C:C', 60)  # Nội dung CĐR
-        worksheet.set_column('D:F', 18)  # Các cột điểm và SV
+        worksheet.set_column('D:G', 18)  # Các cột điểm và SV
     st.download_button(
         label="📥 Tải bảng thống kê CĐR (Excel)",
         data=buffer.getvalue(),
@@ -360,12 +455,6 @@ except Exception as e:
 # =====================================================
 st.subheader(f"📊 Thống kê phân loại số lượng người học đạt CĐR – {selected_hocphan}")
 
-# Tổng số SV có điểm
-total_sv = len(df_hp)
-
-# Tạo dataframe lưu kết quả
-rows = []
-
 import re
 
 # 1) Tạo danh sách CĐR (dựa vào df_cdr nếu có, else dùng question_to_clo)
@@ -389,71 +478,18 @@ else:
     st.error("Không tìm thấy thông tin CĐR. Vui lòng khai báo CĐR trước khi chạy phần phân loại.")
     st.stop()
 
-# 2) Chuẩn bị bảng kết quả phân loại
-rows = []
-
-for r in cdr_rows:
-    cdr_key = r.get('Tên CĐR') or r.get('CĐR') or r.get('CLO') 
-    if not cdr_key:
-        continue
-
-    raw_q = r.get('Câu hỏi', '')
-    if isinstance(raw_q, str):
-        cau_hoi = [q.strip() for q in raw_q.split(',') if q.strip()]
-    elif isinstance(raw_q, (list, tuple, np.ndarray)):
-        cau_hoi = [q for q in raw_q]
-    else:
-        cau_hoi = []
-
-    cau_hoi = [q for q in cau_hoi if q in df_hp.columns]
-
-    if len(cau_hoi) == 0:
-        rows.append({
-            "Ký hiệu CĐR": cdr_key,
-            "Tổng số SV": total_sv,
-            "Loại A (Đạt)": 0, "Loại B (Đạt)": 0, "Loại C (Đạt)": 0, "Loại D (Đạt)": 0, "Loại F (Không đạt)": 0,
-            "Tỷ lệ A (Đạt) (%)": 0, "Tỷ lệ B (Đạt) (%)": 0, "Tỷ lệ C (Đạt) (%)": 0, "Tỷ lệ D (Đạt) (%)": 0, "Tỷ lệ F (Không đạt) (%)": 0
-        })
-        continue
-
-    diem_toi_da_cdr = sum([max_scores.get(q, 0) for q in cau_hoi])
-
-    if 'Điểm tối thiểu' in r and r.get('Điểm tối thiểu') not in [None, '', np.nan]:
-        diem_toi_thieu_cdr = float(r.get('Điểm tối thiểu'))
-    else:
-        ratio = float(r.get('Tỷ lệ điểm tối thiểu (%)') or 0) / 100.0
-        diem_toi_thieu_cdr = round(diem_toi_da_cdr * ratio, 6)
+# 2) Tính bảng phân loại và điểm từng SV theo CĐR
+df_phanloai, diem_sv = phan_loai_cdr(df_diem, pd.DataFrame(cdr_rows), max_scores, xu_ly_thieu)
 
+# Điểm từng SV theo CĐR được gắn vào df_hp để dùng cho phiếu từng SV và tổng hợp PLO
+cdr_sv = []  # (CĐR, cột tổng điểm, cột điểm hệ 10, điểm tối đa)
+for cdr_key, tong, qd, diem_toi_da_cdr in diem_sv:
     safe = re.sub(r'[^0-9a-zA-Z_]', '_', str(cdr_key))
-    sum_col = f"__sum_{safe}"
-    qd_col = f"__qd_{safe}"
-
-    df_hp[sum_col] = df_hp[cau_hoi].apply(pd.to_numeric, errors='coerce').fillna(0).sum(axis=1)
-
-    if diem_toi_da_cdr > 0:
-        df_hp[qd_col] = (df_hp[sum_col] / diem_toi_da_cdr) * 10
-    else:
-        df_hp[qd_col] = 0.0
-
-    A = ((df_hp[qd_col] >= 8.5) & (df_hp[qd_col] <= 10)).sum()
-    B = ((df_hp[qd_col] >= 7.0) & (df_hp[qd_col] < 8.5)).sum()
-    C = ((df_hp[qd_col] >= 5.5) & (df_hp[qd_col] < 7.0)).sum()
-    D = ((df_hp[qd_col] >= 4.0) & (df_hp[qd_col] < 5.5)).sum()
-    F = (df_hp[qd_col] < 4.0).sum()
-
-    pct = lambda x: round((x / total_sv) * 100, 2) if total_sv > 0 else 0.0
-    A_pct, B_pct, C_pct, D_pct, F_pct = map(pct, [A, B, C, D, F])
-
-    rows.append({
-        "Ký hiệu CĐR": cdr_key,
-        "Tổng số SV": total_sv,
-        "Loại A (Đạt)": int(A), "Loại B (Đạt)": int(B), "Loại C (Đạt)": int(C), "Loại D (Đạt)": int(D), "Loại F (Không đạt)": int(F),
-        "Tỷ lệ A (Đạt) (%)": A_pct, "Tỷ lệ B (Đạt) (%)": B_pct, "Tỷ lệ C (Đạt) (%)": C_pct, "Tỷ lệ D (Đạt) (%)": D_pct, "Tỷ lệ F (Không đạt) (%)": F_pct
-    })
+    df_hp[f"__sum_{safe}"] = tong
+    df_hp[f"__qd_{safe}"] = qd
+    cdr_sv.append((cdr_key, f"__sum_{safe}", f"__qd_{safe}", diem_toi_da_cdr))
 
 # 3️⃣ Hiển thị bảng kết quả
-df_phanloai = pd.DataFrame(rows)
-
 if df_phanloai.empty:
     st.warning("Không có kết quả phân loại CĐR để hiển thị.")
 else:
@@ -492,67 +528,186 @@ else:
     # 4️⃣ BIỂU ĐỒ stacked bar (tỷ lệ % A..F)
 st.subheader("🎨 Biểu đồ phân bố A–B–C–D–F theo CĐR")
 
-import matplotlib.pyplot as plt
+try:
+    bd_af = du_lieu_bieu_do_af(df_phanloai)
+    d = loc_cdr(bd_af)
+
+    fig_af_chart = go.Figure()
+    for loai, cot, mau in zip(LOAI_AF, COT_TY_LE_AF, MAU_AF):
+        fig_af_chart.add_bar(
+            x=d["cdr"], y=d[loai], name=cot, marker_color=mau,
+            # chỉ hiển thị giá trị trong cột nếu đủ lớn
+            text=[f"{v:.1f}%" if v >= 3 else "" for v in d[loai]], textposition="inside",
+            hovertemplate=f"%{{x}} – loại {loai}: %{{y:.2f}}%<extra></extra>"
+        )
+    fig_af_chart.update_layout(
+        barmode="stack", title=f"Phân bố A–B–C–D–F theo CĐR – {selected_hocphan}",
+        xaxis_title="Ký hiệu CĐR", yaxis_title="Tỷ lệ (%)", yaxis_range=[0, 100], legend_title="Phân loại"
+    )
+    st.plotly_chart(fig_af_chart, use_container_width=True)
 
-# Cấu hình loại và màu
-categories = [
-    "Tỷ lệ A (Đạt) (%)",
-    "Tỷ lệ B (Đạt) (%)",
-    "Tỷ lệ C (Đạt) (%)",
-    "Tỷ lệ D (Đạt) (%)",
-    "Tỷ lệ F (Không đạt) (%)"
-]
-colors = ['#2ca02c', '#98df8a', '#c7e9b4', '#ffe680', '#ff6666']
+    # ✅ Lưu dữ liệu biểu đồ và bảng phân loại vào session_state để xuất Word
+    st.session_state.bd_af = bd_af
+    st.session_state.df_phanloai = df_phanloai
+
+except Exception as e:
+    st.error(f"⚠️ Lỗi khi tạo biểu đồ A–F: {e}")
+
+# ------------------ PHÂN BỐ ĐIỂM HỆ 10 THEO CĐR ------------------
+st.subheader("📈 Phân bố điểm hệ 10 theo CĐR")
 
 try:
-    # Vẽ stacked bar chart
-    fig_af_chart, ax = plt.subplots(figsize=(10, 6))
-    bottom = np.zeros(len(df_phanloai))
-
-    for i, cat in enumerate(categories):
-        vals = df_phanloai[cat].values
-        ax.bar(df_phanloai["Ký hiệu CĐR"], vals, bottom=bottom, color=colors[i], label=cat)
-        bottom += vals
-
-    # Nhãn trục và tiêu đề
-    ax.set_ylabel("Tỷ lệ (%)", fontsize=11)
-    ax.set_ylim(0, 100)
-    ax.set_xlabel("Ký hiệu CĐR", fontsize=11)
-    ax.set_title(f"Phân bố A–B–C–D–F theo CĐR – {selected_hocphan}", fontsize=13, fontweight="bold")
-
-    # ✅ Di chuyển chú giải ra ngoài để không che cột
-    ax.legend(
-        title="Phân loại",
-        loc="upper left",
-        bbox_to_anchor=(1.02, 1),
-        borderaxespad=0,
-        fontsize=10,
-        title_fontsize=11
-    )
+    # Điểm được gom khoảng ở server bằng np.histogram, trình duyệt chỉ nhận số SV mỗi khoảng
+    fig_hist = go.Figure()
+    for h in histogram_cdr(diem_sv):
+        if h["cdr"] not in cdr_hien_thi:
+            continue
+        bien = h["bien"]
+        fig_hist.add_bar(
+            x=[(a + b) / 2 for a, b in zip(bien[:-1], bien[1:])], y=h["so_sv"], name=h["cdr"],
+            customdata=[f"{a:g}–{b:g}" for a, b in zip(bien[:-1], bien[1:])],
+            hovertemplate=f"{h['cdr']}<br>Điểm %{{customdata}}: %{{y}} SV<extra></extra>"
+        )
+    fig_hist.update_layout(barmode="group", xaxis=dict(title="Điểm hệ 10", dtick=1, range=[0, 10]),
+                           yaxis_title="Số sinh viên")
+    st.plotly_chart(fig_hist, use_container_width=True)
+
+except Exception as e:
+    st.error(f"⚠️ Lỗi khi tạo biểu đồ phân bố điểm: {e}")
 
-    # ✅ Hiển thị giá trị phần trăm trong cột
-    for idx, row in df_phanloai.iterrows():
-        cum = 0
-        for cat in categories:
-            val = row[cat]
-            if val >= 3:  # chỉ hiển thị nếu đủ lớn
-                ax.text(idx, cum + val / 2, f"{val:.1f}%", ha='center', va='center', fontsize=9)
-            cum += val
+# ------------------ PHIẾU KẾT QUẢ CĐR TỪNG SINH VIÊN (ZIP) ------------------
+st.subheader(f"🗂️ Xuất phiếu kết quả CĐR cho từng sinh viên – {selected_hocphan}")
 
-    # Thêm lưới ngang để dễ đọc
-    ax.grid(axis='y', linestyle='--', alpha=0.7)
+if not cdr_sv:
+    st.info("Chưa có CĐR nào được gán câu hỏi để xuất phiếu sinh viên.")
+else:
+    # st.download_button nạp toàn bộ file ZIP vào bộ nhớ nên không phù hợp với khóa học rất lớn
+    st.caption("Với học phần có nhiều sinh viên (hàng nghìn phiếu), nên tải ZIP dạng luồng qua "
+               "endpoint /jobs/<job_id>/phieu.zip của dịch vụ clo_api_server.py.")
+    if st.button("📦 Tạo phiếu từng sinh viên (Word, ZIP)", key="btn_phieu_sv"):
+        f_zip = None
+        try:
+            with st.spinner(f"Đang tạo phiếu cho {len(df_hp)} sinh viên..."):
+                with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as f_zip:
+                    for chunk in tao_zip_phieu(ds_phieu_sinh_vien(df_hp, diem_sv), selected_hocphan):
+                        f_zip.write(chunk)
+
+            with open(f_zip.name, "rb") as f:
+                st.download_button(
+                    label="📥 Tải phiếu kết quả CĐR từng sinh viên (ZIP)",
+                    data=f,
+                    file_name=f"PhieuCDR_SinhVien_{selected_hocphan}.zip",
+                    mime="application/zip"
+                )
+            st.success(f"✅ Đã tạo {len(df_hp)} phiếu kết quả CĐR.")
+        except Exception as e:
+            st.error(f"⚠️ Lỗi khi tạo phiếu sinh viên: {e}")
+        finally:
+            if f_zip is not None and os.path.exists(f_zip.name):
+                os.remove(f_zip.name)
+
+# ------------------ TỔNG HỢP CHUẨN ĐẦU RA CHƯƠNG TRÌNH (PLO) ------------------
+st.header("🏛️ Tổng hợp Chuẩn đầu ra chương trình đào tạo (PLO)")
+
+# --- Lưu điểm CĐR hệ 10 của từng SV theo học phần để tổng hợp qua nhiều học phần ---
+# Mỗi bảng gắn với bộ file đã gộp lúc tính; đổi file tải lên thì bảng của các học phần khác bị bỏ
+if "diem_cdr_hp" not in st.session_state:
+    st.session_state.diem_cdr_hp = {}
+if 'IDSV' in df_hp.columns and cdr_sv:
+    co_ma = df_hp['IDSV'].notna().to_numpy()
+    ma_sv = khoa_sinh_vien(df_hp[co_ma]).get_level_values('IDSV')
+    bang_cdr = pd.DataFrame({k: df_hp.loc[co_ma, q_col].to_numpy(dtype=float) for k, _, q_col, _ in cdr_sv}, index=ma_sv)
+    st.session_state.diem_cdr_hp[selected_hocphan] = {
+        'bang': bang_cdr[~bang_cdr.index.duplicated()],
+        'files': tuple(kho['files']),
+        'xu_ly_thieu': xu_ly_thieu,
+        'luc': datetime.now(),
+    }
+hp_tinh_lai = []
+for hp in list(st.session_state.diem_cdr_hp):
+    if hp not in hocphan_list:
+        del st.session_state.diem_cdr_hp[hp]
+    elif st.session_state.diem_cdr_hp[hp]['files'] != tuple(kho['files']):
+        del st.session_state.diem_cdr_hp[hp]
+        hp_tinh_lai.append(hp)
+
+if hp_tinh_lai:
+    st.warning(f"⚠️ Dữ liệu tải lên đã thay đổi, điểm CĐR cũ của các học phần sau đã bị bỏ khỏi tổng hợp PLO "
+               f"(chọn lại từng học phần để tính lại): {', '.join(map(str, hp_tinh_lai))}")
+
+diem_cdr_hp = {hp: v['bang'] for hp, v in st.session_state.diem_cdr_hp.items()}
+
+
+if not diem_cdr_hp:
+    st.info("Chưa có điểm CĐR theo IDSV của học phần nào để tổng hợp PLO.")
+else:
+    st.write("Học phần đã khai báo CĐR trong phiên làm việc:")
+    st.dataframe(pd.DataFrame([
+        {"Học phần": hp, "Số SV": len(v['bang']), "CĐR": ", ".join(map(str, v['bang'].columns)),
+         "Xử lý thiếu điểm": XU_LY_THIEU[v['xu_ly_thieu']], "Tính lúc": v['luc'].strftime("%H:%M:%S %d/%m/%Y")}
+        for hp, v in st.session_state.diem_cdr_hp.items()
+    ]), use_container_width=True)
+    st.caption("Chọn lần lượt từng học phần ở trên và khai báo CĐR; điểm CĐR của mỗi học phần được giữ lại để tổng hợp PLO. "
+               "Học phần khác học phần đang chọn dùng điểm tối đa và cách xử lý thiếu điểm tại thời điểm tính.")
+
+    mau_map = pd.DataFrame(
+        [(hp, cdr, "", 1.0) for hp, bang in diem_cdr_hp.items() for cdr in bang.columns],
+        columns=["Học phần", "CĐR", "PLO", "Trọng số"])
+
+    file_map = st.file_uploader("Tải lên bảng liên kết CĐR → PLO (CSV/Excel: Học phần, CĐR, PLO, Trọng số)",
+                                type=["csv", "xls", "xlsx"], key="plo_mapping_file")
+    if file_map is not None:
+        try:
+            df_map = doc_file_diem(file_map.name, file_map.getvalue())
+        except Exception as e:
+            st.error(f"Không thể đọc bảng liên kết PLO: {e}")
+            df_map = mau_map
+    else:
+        # Bảng nhập tay; key đổi theo danh sách CĐR nên nội dung đã nhập giữ nguyên khi CĐR không đổi
+        ma_mau = hashlib.sha1(mau_map[["Học phần", "CĐR"]].to_csv(index=False).encode()).hexdigest()[:10]
+        df_map = st.data_editor(mau_map, num_rows="dynamic", use_container_width=True, key=f"plo_editor_{ma_mau}")
 
-    # Hiển thị biểu đồ
-    st.pyplot(fig_af_chart)
+    st.download_button("📥 Tải bảng liên kết CĐR → PLO (CSV)", data=df_map.to_csv(index=False).encode("utf-8-sig"),
+                       file_name="LienKet_CDR_PLO.csv", mime="text/csv")
 
-    # ✅ Lưu biểu đồ và bảng phân loại vào session_state để xuất Word
-    st.session_state.fig_af_chart = fig_af_chart
-    st.session_state.df_phanloai = df_phanloai
+    thieu_cot = [c for c in ["Học phần", "CĐR", "PLO", "Trọng số"] if c not in df_map.columns]
+    if thieu_cot:
+        st.error(f"❌ Bảng liên kết PLO thiếu cột: {', '.join(thieu_cot)}")
+    else:
+        df_plo_sv, df_plo = tinh_plo(diem_cdr_hp, df_map)
+        if df_plo.empty:
+            st.info("Nhập PLO và trọng số cho các CĐR để xem kết quả tổng hợp.")
+        else:
+            st.subheader("📋 Mức độ đạt PLO của khóa/nhóm sinh viên")
+            st.dataframe(df_plo, use_container_width=True)
+
+            with st.expander("Xem điểm PLO (hệ 10) của từng sinh viên"):
+                st.dataframe(df_plo_sv.round(2), use_container_width=True)
+
+            fig_plo = go.Figure()
+            fig_plo.add_bar(
+                x=df_plo["PLO"], y=df_plo["Tỷ lệ SV đạt (%)"], marker_color="#1f77b4", opacity=0.85,
+                text=[f"{v:.1f}%" for v in df_plo["Tỷ lệ SV đạt (%)"]], textposition="outside",
+                customdata=df_plo[["Điểm TB (hệ 10)", "Số SV", "Số học phần"]].to_numpy(),
+                hovertemplate="%{x}: %{y:.2f}% đạt<br>Điểm TB %{customdata[0]:.2f}"
+                              "<br>%{customdata[1]} SV, %{customdata[2]} học phần<extra></extra>"
+            )
+            fig_plo.update_layout(
+                title="Tỷ lệ sinh viên đạt PLO (tổng hợp qua các học phần)",
+                xaxis_title="Chuẩn đầu ra chương trình (PLO)", yaxis_title="Tỷ lệ sinh viên đạt (%)",
+                yaxis_range=[0, 110]
+            )
+            st.plotly_chart(fig_plo, use_container_width=True)
 
-    st.success("✅ Biểu đồ phân loại A–F đã được tạo và lưu thành công!")
+            st.session_state.df_plo = df_plo
 
-except Exception as e:
-    st.error(f"⚠️ Lỗi khi tạo biểu đồ A–F: {e}")
+            buffer = BytesIO()
+            with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
+                df_plo.to_excel(writer, index=False, sheet_name='PLO_TongHop')
+                df_plo_sv.round(2).to_excel(writer, sheet_name='PLO_SinhVien')
+            st.download_button("📥 Tải kết quả PLO (Excel)", data=buffer.getvalue(),
+                               file_name="KetQua_PLO.xlsx",
+                               mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
 
 from openai import OpenAI
 import streamlit as st
@@ -623,13 +778,6 @@ if st.button("🤖 GPT tạo nhận xét & đề xuất", key="btn_gpt"):
 
 
 # ===================== 📄 XUẤT BÁO CÁO CLO (WORD) =====================
-from docx import Document
-from docx.shared import Inches, Pt
-from docx.oxml.ns import qn
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from io import BytesIO
-import os
-
 st.subheader("📘 Xuất báo cáo CLO (Word)")
 
 # --- Nhập nhận xét & đề xuất ---
@@ -646,140 +794,32 @@ st.session_state.dexuat = st.text_area("💡 Nhập đề xuất cải tiến:",
 # --- Nút tạo báo cáo ---
 if st.button("📤 Tạo báo cáo CLO (Word)", key="btn_export_word"):
     try:
-        st.info("🧾 Đã có báo cáo cho bạn, bấm nút để tải về máy.")
-        doc = Document()
-        # ✅ Khai báo sẵn để tránh lỗi
         output_path = f"Bao_cao_CLO_{selected_hocphan}.docx"
 
-        # Cài đặt style font
-        style = doc.styles['Normal']
-        style.font.name = 'Times New Roman'
-        style.element.rPr.rFonts.set(qn('w:eastAsia'), 'Times New Roman')
-        style.font.size = Pt(12)
-
-        # ==================== PHẦN I ====================
-        doc.add_heading("PHẦN I. THÔNG TIN CHUNG", level=1)
-
-        doc.add_paragraph(f"📘 Tên học phần: {selected_hocphan}")
-        doc.add_paragraph(f"👨‍🎓 Số lượng sinh viên: {len(df_hp)}")
-
-        if "df_cdr" in st.session_state:
-            df_cdr = st.session_state.df_cdr
-        else:
-            df_cdr = df_cdr
-
-        doc.add_paragraph("Tổng hợp thông tin CĐR đã khai báo:")
-        table1 = doc.add_table(rows=1, cols=len(df_cdr.columns))
-        table1.style = 'Table Grid'
-        hdr_cells = table1.rows[0].cells
-        for j, col_name in enumerate(df_cdr.columns):
-            p = hdr_cells[j].paragraphs[0]
-            run = p.add_run(col_name)
-            run.bold = True
-            p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-        for _, row in df_cdr.iterrows():
-            row_cells = table1.add_row().cells
-            for j, value in enumerate(row):
-                row_cells[j].text = str(value)
-
-        # ==================== PHẦN II ====================
-        doc.add_heading("PHẦN II. PHÂN TÍCH THỐNG KÊ KẾT QUẢ ĐẠT CHUẨN ĐẦU RA", level=1)
-
-        df_thongke = st.session_state.get("df_thongke")
-        fig_tyle_cdr = st.session_state.get("fig_tyle_cdr")
-
-        # --- Bảng thống kê mức độ đạt ---
-        doc.add_paragraph("1️⃣ Bảng thống kê mức độ đạt CĐR:")
-        if df_thongke is not None:
-            table2 = doc.add_table(rows=1, cols=len(df_thongke.columns))
-            table2.style = 'Table Grid'
-            hdr = table2.rows[0].cells
-            for j, col in enumerate(df_thongke.columns):
-                run = hdr[j].paragraphs[0].add_run(col)
-                run.bold = True
-                hdr[j].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-            for _, row in df_thongke.iterrows():
-                cells = table2.add_row().cells
-                for j, val in enumerate(row):
-                    cells[j].text = str(val)
-        else:
-            doc.add_paragraph("⚠️ Chưa có dữ liệu thống kê mức độ đạt CĐR.")
-
-        # --- Biểu đồ tỷ lệ sinh viên đạt CĐR ---
-        doc.add_paragraph("2️⃣ Biểu đồ tỷ lệ sinh viên đạt Chuẩn đầu ra (CĐR) so với tỷ lệ kỳ vọng:")
-        if fig_tyle_cdr is not None:
-            chart_path = "chart_tylecdr.png"
-            fig_tyle_cdr.savefig(chart_path, bbox_inches="tight")
-            doc.add_picture(chart_path, width=Inches(6))
-            os.remove(chart_path)
-        else:
-            doc.add_paragraph("⚠️ Không thể chèn biểu đồ tỷ lệ đạt CĐR.")
-
-        # ==================== PHẦN III ====================
-        doc.add_heading("PHẦN III. THỐNG KÊ PHÂN LOẠI NGƯỜI HỌC ĐẠT CĐR", level=1)
-
-        df_af_summary = st.session_state.get("df_af_summary")
-        fig_af_chart = st.session_state.get("fig_af_chart")
-
-        # --- Bảng phân loại A-F ---
-        doc.add_paragraph("1️⃣ Bảng phân loại A–B–C–D–F theo CĐR (số lượng & tỷ lệ):")
-        if df_af_summary is not None:
-            table3 = doc.add_table(rows=1, cols=len(df_af_summary.columns))
-            table3.style = 'Table Grid'
-            hdr3 = table3.rows[0].cells
-            for j, col in enumerate(df_af_summary.columns):
-                run = hdr3[j].paragraphs[0].add_run(col)
-                run.bold = True
-                hdr3[j].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-            for _, row in df_af_summary.iterrows():
-                cells = table3.add_row().cells
-                for j, val in enumerate(row):
-                    cells[j].text = str(val)
-        else:
-            doc.add_paragraph("⚠️ Chưa có dữ liệu phân loại A–F để hiển thị.")
-
-        # --- Biểu đồ phân bố điểm A-F ---
-        doc.add_paragraph("2️⃣ Biểu đồ phân bố điểm A–B–C–D–F theo CĐR:")
-        if fig_af_chart is not None:
-            chart_path2 = "chart_af.png"
-            fig_af_chart.savefig(chart_path2, bbox_inches="tight")
-            doc.add_picture(chart_path2, width=Inches(6))
-            os.remove(chart_path2)
-        else:
-            doc.add_paragraph("⚠️ Không thể chèn biểu đồ A–F.")
-
-        # ==================== PHẦN IV ====================
-        doc.add_heading("PHẦN IV. NHẬN XÉT – ĐỀ XUẤT AI", level=1)
-        doc.add_paragraph(f"1️⃣ Nhận xét: {st.session_state.nhanxet}")
-        doc.add_paragraph(f"2️⃣ Đề xuất: {st.session_state.dexuat}")
-
-        with open(output_path, "rb") as f:
-            file_bytes = f.read()   # Đọc dữ liệu ra bộ nhớ
+        # Ảnh tĩnh cho báo cáo Word được vẽ ở server từ dữ liệu biểu đồ đã tổng hợp
+        bd_ty_le = st.session_state.get("bd_ty_le")
+        bd_af = st.session_state.get("bd_af")
+
+        file_bytes = tao_bao_cao_word(
+            selected_hocphan,
+            len(df_hp),
+            st.session_state.get("df_cdr", df_cdr),
+            st.session_state.get("df_thongke"),
+            st.session_state.get("df_af_summary"),
+            nhanxet=st.session_state.nhanxet,
+            dexuat=st.session_state.dexuat,
+            hinh_ty_le_cdr=anh_bieu_do_ty_le(bd_ty_le, selected_hocphan) if bd_ty_le else None,
+            hinh_af=anh_bieu_do_af(bd_af, selected_hocphan) if bd_af else None,
+        )
 
+        st.info("🧾 Đã có báo cáo cho bạn, bấm nút để tải về máy.")
         st.download_button(
             label="📥 Tải xuống báo cáo Word (A4)",
-            data=file_bytes,  # ✅ Dùng bytes, không dùng f nữa
+            data=file_bytes,
             file_name=output_path,
             mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-)
+        )
+        st.success("✅ Báo cáo Word đã được tạo thành công!")
 
     except Exception as e:
         st.error(f"⚠️ Lỗi khi tạo báo cáo: {e}")
-        
-        # ==================== LƯU & TẢI ====================
-    output_path = f"Bao_cao_CLO_{selected_hocphan}.docx"
-    doc.save(output_path)
-
-        
-    st.success("✅ Báo cáo Word đã được tạo thành công!")
-
-    
-
-
-
-
-
-
-
-
@@ -0,0 +1,114 @@
+"""Client kiểm thử tải cho dịch vụ HTTP đo lường CLO (clo_api_server.py), chạy hoàn toàn cục bộ.
+
+Chạy:  python clo_api_loadtest.py --url http://127.0.0.1:8765 --file dataclo.xlsx --jobs 200 --concurrency 16
+
+Mỗi job dùng một cấu hình khác nhau (tỷ lệ điểm tối thiểu thay đổi theo số thứ tự) trừ khi
+dùng --repeat, khi đó các job trùng nhau để đo hiệu quả cache kết quả.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+
+def goi(url, method="GET", data=None, headers=None):
+    """Gửi yêu cầu HTTP; trả về (mã trạng thái, body bytes), mã 0 nếu lỗi kết nối."""
+    req = urllib.request.Request(url, data=data, method=method, headers=headers or {})
+    try:
+        with urllib.request.urlopen(req, timeout=120) as resp:
+            return resp.status, resp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+    except (urllib.error.URLError, ConnectionError, TimeoutError):
+        return 0, b""
+
+
+def trang_thai_loi(ma):
+    """Trạng thái thất bại của một job theo mã HTTP (0 = lỗi kết nối)."""
+    return "loi_ket_noi" if ma == 0 else f"http_{ma}"
+
+
+def chay_mot_job(base_url, cau_hinh):
+    """Nộp job, chờ xong rồi tải file Excel; trả về (trạng thái cuối, thời gian giây)."""
+    t0 = time.perf_counter()
+    body = json.dumps(cau_hinh, ensure_ascii=False).encode("utf-8")
+    while True:
+        ma, data = goi(f"{base_url}/jobs", "POST", body, {"Content-Type": "application/json"})
+        if ma != 503:
+            break
+        time.sleep(0.2)  # hàng đợi đầy: thử lại
+    if ma not in (200, 202):
+        return trang_thai_loi(ma), time.perf_counter() - t0
+    job_id = json.loads(data)["job_id"]
+
+    while True:
+        ma, data = goi(f"{base_url}/jobs/{job_id}")
+        if ma != 200:
+            return trang_thai_loi(ma), time.perf_counter() - t0
+        status = json.loads(data)["status"]
+        if status in ("xong", "loi"):
+            break
+        time.sleep(0.05)
+    if status == "xong":
+        ma, _ = goi(f"{base_url}/jobs/{job_id}/excel")
+        if ma != 200:
+            status = f"excel_{trang_thai_loi(ma)}"
+    return status, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kiểm thử tải dịch vụ CLO")
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--file", default="dataclo.xlsx")
+    parser.add_argument("--hoc-phan", default=None, help="Mặc định: học phần đầu tiên trong file")
+    parser.add_argument("--jobs", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--repeat", action="store_true", help="Dùng cùng một cấu hình cho mọi job")
+    args = parser.parse_args()
+
+    with open(args.file, "rb") as f:
+        ma, data = goi(f"{args.url}/uploads?name={quote(os.path.basename(args.file))}", "POST", f.read())
+    if ma != 201:
+        raise SystemExit(f"Tải file thất bại ({ma}): {data.decode('utf-8', 'replace')}")
+    upload = json.loads(data)
+    hoc_phan = args.hoc_phan or next(iter(upload["hoc_phan"]))
+    cau_hoi = upload["hoc_phan"][hoc_phan]
+    print(f"upload_id={upload['upload_id'][:12]}  học phần='{hoc_phan}'  câu hỏi={cau_hoi}")
+
+    def cau_hinh(i):
+        tile_min = 40 if args.repeat else 10 + (i % 80)
+        return {
+            "upload_id": upload["upload_id"],
+            "hoc_phan": hoc_phan,
+            "max_scores": {q: 2.0 for q in cau_hoi},
+            "cdr": [{"Tên CĐR": f"CĐR{k + 1}", "Câu hỏi": [q], "Tỷ lệ điểm tối thiểu (%)": tile_min,
+                     "Tỷ lệ kỳ vọng (%)": 75} for k, q in enumerate(cau_hoi)],
+            "xu_ly_thieu": "zero",
+        }
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        ket_qua = list(pool.map(lambda i: chay_mot_job(args.url, cau_hinh(i)), range(args.jobs)))
+    tong_tg = time.perf_counter() - t0
+
+    thoi_gian = sorted(tg for _, tg in ket_qua)
+    dem = {}
+    for status, _ in ket_qua:
+        dem[status] = dem.get(status, 0) + 1
+    print(f"{args.jobs} job trong {tong_tg:.2f}s -> {args.jobs / tong_tg:.1f} job/s  trạng thái={dem}")
+    print(f"độ trễ: trung bình={statistics.mean(thoi_gian):.3f}s  "
+          f"p50={thoi_gian[len(thoi_gian) // 2]:.3f}s  p95={thoi_gian[int(0.95 * (len(thoi_gian) - 1))]:.3f}s")
+
+    ma, data = goi(f"{args.url}/metrics")
+    if ma == 200:
+        print("metrics:", json.dumps(json.loads(data), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,490 @@
+"""Dịch vụ HTTP cục bộ chạy pipeline đo lường CLO, dùng cho tích hợp hệ thống (LMS, ...).
+
+Chạy:  python clo_api_server.py --host 127.0.0.1 --port 8765 --workers 2 --queue 32
+
+Endpoint:
+  GET  /health                    kiểm tra dịch vụ
+  GET  /metrics                   số liệu hoạt động (JSON)
+  POST /uploads?name=<tên file>   body = nội dung file CSV/Excel -> upload_id và danh sách học phần
+  POST /jobs                      body = JSON cấu hình (xem bên dưới) -> job_id
+  GET  /jobs/<job_id>             trạng thái và kết quả (bảng thống kê, bảng A–F, bất thường,
+                                  dữ liệu biểu đồ đã tổng hợp)
+  GET  /jobs/<job_id>/excel       file Excel kết quả
+  GET  /jobs/<job_id>/word        báo cáo Word
+  GET  /jobs/<job_id>/phieu.zip   ZIP phiếu kết quả từng SV, gửi dạng luồng (chunked) trong khi tạo
+
+Cấu hình job:
+  {"upload_id": "...", "hoc_phan": "Kinh tế vi mô",
+   "max_scores": {"Câu 1": 2.0, ...},
+   "cdr": [{"Tên CĐR": "CĐR1", "Nội dung": "...", "Câu hỏi": ["Câu 1", "Câu 2"],
+            "Tỷ lệ điểm tối thiểu (%)": 40, "Tỷ lệ kỳ vọng (%)": 75}],
+   "xu_ly_thieu": "zero"}
+
+xu_ly_thieu: "zero" (tính là 0 điểm), "exclude" (loại SV thiếu điểm khỏi CĐR tương ứng) hoặc
+"mean" (thay bằng điểm trung bình của câu hỏi); mặc định "zero".
+
+Job được đưa vào hàng đợi có giới hạn và xử lý bởi một nhóm worker cố định; job có cùng
+nội dung đầu vào (file + cấu hình) dùng lại kết quả đã tính. Số file tải lên được đọc đồng thời và
+số ZIP phiếu SV được tạo đồng thời (dùng chung một nhóm tiến trình) cũng có giới hạn; vượt giới hạn
+thì trả 503 kèm Retry-After.
+"""
+
+import argparse
+import hashlib
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from clo_pipeline import (
+    XU_LY_THIEU, anh_bieu_do_af, anh_bieu_do_ty_le, chay_pipeline, doc_file_diem, du_lieu_bieu_do_af,
+    du_lieu_bieu_do_ty_le, histogram_cdr, lay_cot_diem, tach_cau_hoi, tao_bao_cao_word, tao_pool_tien_trinh,
+    xuat_excel,
+)
+from clo_student_reports import COT_THONG_TIN_SV, ds_phieu_sinh_vien, tao_zip_phieu
+
+KICH_THUOC_FILE_TOI_DA = 50 * 1024 * 1024
+
+MIME_EXCEL = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+MIME_WORD = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+class HangDoiDay(Exception):
+    """Hàng đợi job đã đầy hoặc đã đủ số việc được xử lý đồng thời."""
+
+
+class LoiYeuCau(Exception):
+    """Yêu cầu HTTP không hợp lệ; args = (mã trạng thái, thông báo lỗi)."""
+
+
+def kiem_tra_cau_hinh(cau_hinh):
+    """Kiểm tra kiểu dữ liệu của cấu hình job trước khi đưa vào hàng đợi; sai thì ValueError."""
+    if not isinstance(cau_hinh, dict):
+        raise ValueError("Cấu hình job phải là một đối tượng JSON.")
+    if not isinstance(cau_hinh.get("upload_id"), str):
+        raise ValueError("Cấu hình chưa có 'upload_id'.")
+    if cau_hinh.get("hoc_phan") is not None and not isinstance(cau_hinh["hoc_phan"], str):
+        raise ValueError("'hoc_phan' phải là chuỗi.")
+    if cau_hinh.get("xu_ly_thieu", "zero") not in XU_LY_THIEU:
+        raise ValueError(f"xu_ly_thieu phải là một trong: {', '.join(XU_LY_THIEU)}")
+
+    max_scores = cau_hinh.get("max_scores", {})
+    if not isinstance(max_scores, dict) or not all(
+            isinstance(v, (int, float)) and not isinstance(v, bool) and v > 0 for v in max_scores.values()):
+        raise ValueError("'max_scores' phải là đối tượng {câu hỏi: điểm tối đa > 0}.")
+
+    ds_cdr = cau_hinh.get("cdr")
+    if not ds_cdr:
+        raise ValueError("Cấu hình chưa khai báo CĐR ('cdr').")
+    if not isinstance(ds_cdr, list):
+        raise ValueError("'cdr' phải là danh sách các CĐR.")
+    ten_cdr = []
+    for i, r in enumerate(ds_cdr, start=1):
+        if not isinstance(r, dict) or not isinstance(r.get("Tên CĐR"), str) or not r["Tên CĐR"].strip():
+            raise ValueError(f"CĐR thứ {i}: phải là đối tượng có 'Tên CĐR'.")
+        cau_hoi = r.get("Câu hỏi", [])
+        if not isinstance(cau_hoi, str) and not (
+                isinstance(cau_hoi, list) and all(isinstance(q, str) for q in cau_hoi)):
+            raise ValueError(f"CĐR '{r['Tên CĐR']}': 'Câu hỏi' phải là chuỗi hoặc danh sách chuỗi.")
+        for khoa in ("Tỷ lệ điểm tối thiểu (%)", "Tỷ lệ kỳ vọng (%)"):
+            v = r.get(khoa, 0)
+            if not isinstance(v, (int, float)) or isinstance(v, bool) or not 0 <= v <= 100:
+                raise ValueError(f"CĐR '{r['Tên CĐR']}': '{khoa}' phải là số trong khoảng 0–100.")
+        ten_cdr.append(r["Tên CĐR"])
+    trung = sorted({t for t in ten_cdr if ten_cdr.count(t) > 1})
+    if trung:
+        raise ValueError(f"Tên CĐR bị trùng: {', '.join(trung)}")
+
+
+def chuan_hoa_cau_hinh(cau_hinh, cot_diem_hp):
+    """Cấu hình đã điền giá trị mặc định và chuẩn hóa kiểu; cùng phép tính thì cùng mã job.
+
+    cot_diem_hp: học phần -> các cột điểm của file đã tải lên. Điểm tối đa được điền đủ cho mọi
+    câu hỏi của học phần (mặc định 1.0 như chay_pipeline), câu không thuộc học phần bị bỏ.
+    """
+    hoc_phan = cau_hinh.get("hoc_phan")
+    if hoc_phan is None and len(cot_diem_hp) == 1:
+        hoc_phan = next(iter(cot_diem_hp))
+    max_scores = cau_hinh.get("max_scores", {})
+    return {
+        "upload_id": cau_hinh["upload_id"],
+        "hoc_phan": hoc_phan,
+        "max_scores": {q: float(max_scores.get(q, 1.0)) for q in cot_diem_hp.get(hoc_phan, [])},
+        "cdr": [{
+            "Tên CĐR": r["Tên CĐR"],
+            "Nội dung": r.get("Nội dung", ""),
+            "Câu hỏi": tach_cau_hoi(r.get("Câu hỏi")),
+            "Tỷ lệ điểm tối thiểu (%)": float(r.get("Tỷ lệ điểm tối thiểu (%)", 40.0)),
+            "Tỷ lệ kỳ vọng (%)": float(r.get("Tỷ lệ kỳ vọng (%)", 75.0)),
+        } for r in cau_hinh["cdr"]],
+        "xu_ly_thieu": cau_hinh.get("xu_ly_thieu", "zero"),
+    }
+
+
+class DichVuCLO:
+    """Kho file đã tải lên, kho kết quả (LRU), nhóm worker xử lý job từ hàng đợi và nhóm tiến trình tạo phiếu SV."""
+
+    def __init__(self, so_worker=2, hang_doi_toi_da=32, so_file_toi_da=64, so_ket_qua_toi_da=256, so_zip_toi_da=2,
+                 so_upload_toi_da=2):
+        self.so_worker = so_worker
+        self.so_file_toi_da = so_file_toi_da
+        self.so_ket_qua_toi_da = so_ket_qua_toi_da
+        self.uploads = OrderedDict()  # upload_id -> {"name", "df", "hoc_phan"}
+        self.jobs = OrderedDict()     # job_id -> job
+        self.hang_doi = queue.Queue(maxsize=hang_doi_toi_da)
+        self.lock = threading.Lock()
+        # Số việc nặng được chạy đồng thời trong các luồng xử lý HTTP
+        self.gioi_han = {"zip": threading.BoundedSemaphore(so_zip_toi_da),
+                         "upload": threading.BoundedSemaphore(so_upload_toi_da)}
+        self.so_tien_trinh = max(1, so_worker)
+        self._pool_phieu = None
+
+        self.bat_dau = time.time()
+        self.dem = {"uploads": 0, "jobs_nhan": 0, "jobs_xong": 0, "jobs_loi": 0,
+                    "jobs_tu_choi": 0, "trung_cache": 0, "dang_chay": 0, "zip_tu_choi": 0,
+                    "upload_tu_choi": 0}
+        self.thoi_gian_xu_ly = deque(maxlen=1000)
+
+        for i in range(so_worker):
+            threading.Thread(target=self._worker, name=f"clo-worker-{i}", daemon=True).start()
+
+    # ----------------- Upload -----------------
+    def tai_len(self, ten_file, noi_dung):
+        """Lưu file (đọc một lần, cache theo hash nội dung); trả về upload_id và các học phần.
+
+        File mới chỉ được đọc khi còn chỗ trong giới hạn "upload", nếu không thì HangDoiDay.
+        """
+        upload_id = hashlib.sha256(noi_dung).hexdigest()
+        with self.lock:
+            da_co = self.uploads.get(upload_id)
+            if da_co is not None:
+                self.uploads.move_to_end(upload_id)
+        if da_co is None:
+            with self.giu_cho("upload"):
+                df = doc_file_diem(ten_file, noi_dung)
+            if 'Tên học phần' not in df.columns:
+                raise ValueError("Dữ liệu chưa có cột 'Tên học phần'.")
+            hoc_phan = {str(hp): lay_cot_diem(df[df['Tên học phần'] == hp])
+                        for hp in df['Tên học phần'].dropna().unique()}
+            da_co = {"name": ten_file, "df": df, "hoc_phan": hoc_phan}
+            with self.lock:
+                self.uploads[upload_id] = da_co
+                self.dem["uploads"] += 1
+                while len(self.uploads) > self.so_file_toi_da:
+                    self.uploads.popitem(last=False)
+
+        return {"upload_id": upload_id, "name": da_co["name"], "so_dong": len(da_co["df"]),
+                "hoc_phan": da_co["hoc_phan"]}
+
+    # ----------------- Job -----------------
+    def nop_job(self, cau_hinh):
+        """Đưa job vào hàng đợi; job trùng đầu vào dùng lại job/kết quả đã có."""
+        kiem_tra_cau_hinh(cau_hinh)
+        upload_id = cau_hinh["upload_id"]
+        with self.lock:
+            if upload_id not in self.uploads:
+                raise KeyError(f"Không tìm thấy upload_id '{upload_id}'.")
+            cot_diem_hp = self.uploads[upload_id]["hoc_phan"]
+        cau_hinh = chuan_hoa_cau_hinh(cau_hinh, cot_diem_hp)
+
+        # Mã job = hash của file + cấu hình chuẩn hóa, dùng làm khóa cache kết quả
+        job_id = hashlib.sha256(json.dumps(cau_hinh, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None and job["status"] != "loi":
+                self.jobs.move_to_end(job_id)
+                self.dem["trung_cache"] += 1
+                return job
+            job = {"job_id": job_id, "status": "cho", "cau_hinh": cau_hinh, "ket_qua": None,
+                   "excel": None, "word": None, "phieu": None, "loi": None, "nop_luc": time.time()}
+            try:
+                self.hang_doi.put_nowait(job)
+            except queue.Full:
+                self.dem["jobs_tu_choi"] += 1
+                raise HangDoiDay()
+            self.jobs[job_id] = job
+            self.dem["jobs_nhan"] += 1
+            self._don_ket_qua()
+        return job
+
+    def lay_job(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def _don_ket_qua(self):
+        """Bỏ các job đã xong cũ nhất khi kho kết quả vượt giới hạn (gọi khi đang giữ lock)."""
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.so_ket_qua_toi_da:
+                break
+            if self.jobs[job_id]["status"] in ("xong", "loi"):
+                del self.jobs[job_id]
+
+    def _worker(self):
+        while True:
+            job = self.hang_doi.get()
+            with self.lock:
+                job["status"] = "dang_chay"
+                self.dem["dang_chay"] += 1
+                df = self.uploads.get(job["cau_hinh"]["upload_id"], {}).get("df")
+            t0 = time.perf_counter()
+            try:
+                if df is None:
+                    raise KeyError("File đã tải lên không còn trong bộ nhớ, vui lòng tải lại.")
+                ch = job["cau_hinh"]
+                kq = chay_pipeline(df, ch.get("hoc_phan"), ch.get("max_scores", {}), ch["cdr"],
+                                   ch.get("xu_ly_thieu", "zero"))
+                bd_ty_le = du_lieu_bieu_do_ty_le(kq["df_thongke"], kq["df_cdr"])
+                bd_af = du_lieu_bieu_do_af(kq["df_phanloai"])
+                job["excel"] = xuat_excel(kq["df_thongke"], kq["df_phanloai"])
+                job["word"] = tao_bao_cao_word(kq["hoc_phan"], kq["so_sv"], kq["df_cdr"],
+                                               kq["df_thongke"], kq["df_phanloai"],
+                                               hinh_ty_le_cdr=anh_bieu_do_ty_le(bd_ty_le, kq["hoc_phan"]),
+                                               hinh_af=anh_bieu_do_af(bd_af, kq["hoc_phan"]))
+                # Chỉ giữ thông tin SV và điểm theo CĐR; phiếu được tạo khi client tải ZIP
+                job["phieu"] = (kq["df_hp"].reindex(columns=COT_THONG_TIN_SV), kq["diem_sv"])
+                job["ket_qua"] = {
+                    "hoc_phan": kq["hoc_phan"],
+                    "so_sv": kq["so_sv"],
+                    "thong_ke": json.loads(kq["df_thongke"].to_json(orient="records", force_ascii=False)),
+                    "phan_loai": json.loads(kq["df_phanloai"].to_json(orient="records", force_ascii=False)),
+                    "so_o_bat_thuong": len(kq["df_loi"]),
+                    "bat_thuong": json.loads(kq["df_loi"].head(1000).to_json(orient="records", force_ascii=False)),
+                    # Dữ liệu đã tổng hợp để client tự vẽ biểu đồ
+                    "bieu_do": {"ty_le_dat": bd_ty_le, "phan_bo_af": bd_af, "histogram": histogram_cdr(kq["diem_sv"])},
+                }
+                trang_thai = "xong"
+            except Exception as e:
+                job["loi"] = str(e)
+                trang_thai = "loi"
+            thoi_gian = time.perf_counter() - t0
+            with self.lock:
+                job["status"] = trang_thai
+                job["thoi_gian_xu_ly"] = round(thoi_gian, 4)
+                self.dem["dang_chay"] -= 1
+                self.dem["jobs_xong" if trang_thai == "xong" else "jobs_loi"] += 1
+                self.thoi_gian_xu_ly.append(thoi_gian)
+            self.hang_doi.task_done()
+
+    @contextmanager
+    def giu_cho(self, ten):
+        """Giữ một chỗ trong giới hạn xử lý đồng thời `ten` ("zip", "upload"); hết chỗ thì HangDoiDay."""
+        if not self.gioi_han[ten].acquire(blocking=False):
+            with self.lock:
+                self.dem[f"{ten}_tu_choi"] += 1
+            raise HangDoiDay()
+        try:
+            yield
+        finally:
+            self.gioi_han[ten].release()
+
+    # ----------------- Phiếu SV -----------------
+    def luong_phieu(self, job):
+        """Generator các đoạn ZIP phiếu SV của job, tạo trong nhóm tiến trình dùng chung."""
+        with self.lock:
+            if self._pool_phieu is None:
+                self._pool_phieu = tao_pool_tien_trinh(self.so_tien_trinh)
+            pool = self._pool_phieu
+        df_sv, diem_sv = job["phieu"]
+        return tao_zip_phieu(ds_phieu_sinh_vien(df_sv, diem_sv), job["ket_qua"]["hoc_phan"],
+                             max_workers=self.so_tien_trinh, pool=pool)
+
+    def dong(self):
+        with self.lock:
+            pool, self._pool_phieu = self._pool_phieu, None
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    # ----------------- Metrics -----------------
+    def metrics(self):
+        with self.lock:
+            tg = sorted(self.thoi_gian_xu_ly)
+            dem = dict(self.dem)
+            so_job, so_upload = len(self.jobs), len(self.uploads)
+        phan_vi = lambda p: round(tg[min(len(tg) - 1, int(p * len(tg)))], 4) if tg else None
+        return {
+            **dem,
+            "hang_doi": self.hang_doi.qsize(),
+            "hang_doi_toi_da": self.hang_doi.maxsize,
+            "so_worker": self.so_worker,
+            "so_job_luu": so_job,
+            "so_file_luu": so_upload,
+            "thoi_gian_xu_ly_p50": phan_vi(0.5),
+            "thoi_gian_xu_ly_p95": phan_vi(0.95),
+            "uptime_giay": round(time.time() - self.bat_dau, 1),
+        }
+
+
+class XuLyYeuCau(BaseHTTPRequestHandler):
+    """Định tuyến các endpoint HTTP tới DichVuCLO (self.server.dich_vu)."""
+
+    server_version = "CLOService/1.0"
+    # HTTP/1.1 để gửi ZIP phiếu SV bằng Transfer-Encoding: chunked
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _tra_json(self, ma, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(ma)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if ma == 503:
+            self.send_header("Retry-After", "1")
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _tra_file(self, noi_dung, mime, ten_file):
+        self.send_response(200)
+        self.send_header("Content-Type", mime)
+        self.send_header("Content-Length", str(len(noi_dung)))
+        self.send_header("Content-Disposition", f"attachment; filename=\"{ten_file}\"")
+        self.end_headers()
+        self.wfile.write(noi_dung)
+
+    def _tra_luong(self, cac_doan, mime, ten_file):
+        """Gửi nội dung theo từng đoạn (chunked) ngay khi được tạo, không giữ toàn bộ trong bộ nhớ."""
+        self.send_response(200)
+        self.send_header("Content-Type", mime)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Content-Disposition", f"attachment; filename=\"{ten_file}\"")
+        self.end_headers()
+        try:
+            for doan in cac_doan:
+                if doan:
+                    self.wfile.write(f"{len(doan):X}\r\n".encode("ascii") + doan + b"\r\n")
+        except Exception:
+            # Đã gửi header 200: đóng kết nối để client thấy dữ liệu bị cắt ngang
+            self.close_connection = True
+            raise
+        finally:
+            cac_doan.close()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _doc_body(self):
+        """Đọc body theo Content-Length; header thiếu, sai hoặc quá lớn thì LoiYeuCau (body chưa được đọc)."""
+        do_dai = self.headers.get("Content-Length")
+        if do_dai is None:
+            raise LoiYeuCau(411, "Thiếu header Content-Length.")
+        do_dai = do_dai.strip()
+        if not (do_dai.isascii() and do_dai.isdigit()):
+            raise LoiYeuCau(400, "Header Content-Length không hợp lệ.")
+        if int(do_dai) > KICH_THUOC_FILE_TOI_DA:
+            raise LoiYeuCau(413, "File vượt quá kích thước cho phép.")
+        return self.rfile.read(int(do_dai))
+
+    def do_GET(self):
+        dv = self.server.dich_vu
+        phan = [p for p in urlparse(self.path).path.split("/") if p]
+
+        if phan == ["health"]:
+            return self._tra_json(200, {"status": "ok"})
+        if phan == ["metrics"]:
+            return self._tra_json(200, dv.metrics())
+        if len(phan) in (2, 3) and phan[0] == "jobs":
+            job = dv.lay_job(phan[1])
+            if job is None:
+                return self._tra_json(404, {"loi": "Không tìm thấy job."})
+            if len(phan) == 2:
+                return self._tra_json(200, {k: job.get(k) for k in
+                                            ("job_id", "status", "loi", "thoi_gian_xu_ly", "ket_qua")})
+            if job["status"] != "xong":
+                return self._tra_json(409, {"job_id": job["job_id"], "status": job["status"], "loi": job["loi"]})
+            if phan[2] == "excel":
+                return self._tra_file(job["excel"], MIME_EXCEL, f"KetQua_CDR_{job['job_id'][:12]}.xlsx")
+            if phan[2] == "word":
+                return self._tra_file(job["word"], MIME_WORD, f"Bao_cao_CLO_{job['job_id'][:12]}.docx")
+            if phan[2] == "phieu.zip":
+                try:
+                    with dv.giu_cho("zip"):
+                        return self._tra_luong(dv.luong_phieu(job), "application/zip",
+                                               f"PhieuCDR_SinhVien_{job['job_id'][:12]}.zip")
+                except HangDoiDay:
+                    return self._tra_json(503, {"loi": "Đang tạo quá nhiều file ZIP, vui lòng thử lại sau."})
+        self._tra_json(404, {"loi": "Không tìm thấy endpoint."})
+
+    def do_POST(self):
+        dv = self.server.dich_vu
+        url = urlparse(self.path)
+        try:
+            body = self._doc_body()
+        except LoiYeuCau as e:
+            # Body chưa được đọc nên không thể dùng lại kết nối
+            self.close_connection = True
+            return self._tra_json(e.args[0], {"loi": e.args[1]})
+
+        if url.path == "/uploads":
+            ten_file = parse_qs(url.query).get("name", [self.headers.get("X-File-Name", "upload.xlsx")])[0]
+            try:
+                return self._tra_json(201, dv.tai_len(ten_file, body))
+            except HangDoiDay:
+                return self._tra_json(503, {"loi": "Đang đọc quá nhiều file tải lên, vui lòng thử lại sau."})
+            except Exception as e:
+                return self._tra_json(400, {"loi": f"Không thể đọc file: {e}"})
+
+        if url.path == "/jobs":
+            try:
+                job = dv.nop_job(json.loads(body or b"{}"))
+            except HangDoiDay:
+                return self._tra_json(503, {"loi": "Hàng đợi đã đầy, vui lòng thử lại sau."})
+            except KeyError as e:
+                return self._tra_json(404, {"loi": str(e.args[0])})
+            except (ValueError, TypeError) as e:
+                return self._tra_json(400, {"loi": str(e)})
+            ma = 200 if job["status"] == "xong" else 202
+            return self._tra_json(ma, {"job_id": job["job_id"], "status": job["status"]})
+
+        self._tra_json(404, {"loi": "Không tìm thấy endpoint."})
+
+
+class MayChuCLO(ThreadingHTTPServer):
+    daemon_threads = True
+    # Hàng đợi kết nối chờ accept; mặc định 5 của socketserver quá nhỏ khi nhiều client hỏi trạng thái job
+    # liên tục, kết nối vượt hàng đợi bị hệ điều hành reset
+    request_queue_size = 128
+
+    def server_close(self):
+        super().server_close()
+        self.dich_vu.dong()
+
+
+def tao_server(host="127.0.0.1", port=8765, so_worker=2, hang_doi_toi_da=32, verbose=False, so_zip_toi_da=2,
+               so_upload_toi_da=2):
+    server = MayChuCLO((host, port), XuLyYeuCau)
+    server.dich_vu = DichVuCLO(so_worker=so_worker, hang_doi_toi_da=hang_doi_toi_da, so_zip_toi_da=so_zip_toi_da,
+                               so_upload_toi_da=so_upload_toi_da)
+    server.verbose = verbose
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dịch vụ HTTP cục bộ đo lường CLO")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2, help="Số worker xử lý job")
+    parser.add_argument("--queue", type=int, default=32, help="Số job chờ tối đa trong hàng đợi")
+    parser.add_argument("--zip", type=int, default=2, help="Số file ZIP phiếu SV được tạo đồng thời")
+    parser.add_argument("--uploads", type=int, default=2, help="Số file tải lên được đọc đồng thời")
+    parser.add_argument("--verbose", action="store_true", help="Ghi log từng yêu cầu HTTP")
+    args = parser.parse_args()
+
+    server = tao_server(args.host, args.port, args.workers, args.queue, args.verbose, args.zip, args.uploads)
+    print(f"Dịch vụ CLO đang chạy tại http://{args.host}:{args.port} "
+          f"({args.workers} worker, hàng đợi {args.queue})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,660 @@
+"""Các bước tính toán đo lường CLO dùng chung cho giao diện Streamlit và dịch vụ HTTP.
+
+Các hàm ở đây không phụ thuộc Streamlit: nhận DataFrame / dict cấu hình và trả về
+DataFrame hoặc bytes (Excel, Word).
+"""
+
+import multiprocessing
+import sys
+import threading
+import types
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml.ns import qn
+from docx.shared import Inches, Pt
+from matplotlib.figure import Figure
+from scipy import sparse
+
+# --- Các cột không phải điểm ---
+IGNORE_COLS = ['Tên học phần', 'IDSV', 'Họ và tên SV', 'Lớp', 'Số phách', 'Tổng điểm', 'Mã đề', 'File nguồn']
+
+# --- Cách xử lý ô điểm bị thiếu (kể cả ô không phải số): mã ổn định (dùng trong code và API) -> nhãn giao diện ---
+XU_LY_THIEU = {
+    "zero": "Tính là 0 điểm",
+    "exclude": "Loại SV thiếu điểm khỏi CĐR tương ứng",
+    "mean": "Thay bằng điểm trung bình của câu hỏi",
+}
+
+# --- Các mức A–F trong bảng phân loại và màu dùng cho biểu đồ ---
+LOAI_AF = ["A", "B", "C", "D", "F"]
+COT_TY_LE_AF = [
+    "Tỷ lệ A (Đạt) (%)",
+    "Tỷ lệ B (Đạt) (%)",
+    "Tỷ lệ C (Đạt) (%)",
+    "Tỷ lệ D (Đạt) (%)",
+    "Tỷ lệ F (Không đạt) (%)"
+]
+MAU_AF = ['#2ca02c', '#98df8a', '#c7e9b4', '#ffe680', '#ff6666']
+
+
+class _TienTrinhForkServer(multiprocessing.context.ForkServerProcess):
+    """Tiến trình forkserver không nạp lại module __main__ của tiến trình cha.
+
+    Tiến trình con của forkserver nạp lại __main__; khi __main__ là script Streamlit thì cả giao diện
+    sẽ bị chạy lại trong tiến trình con. Vì vậy __main__ được thay tạm bằng module rỗng trong lúc khởi động
+    mỗi tiến trình (ProcessPoolExecutor có thể tạo thêm tiến trình ở bất kỳ lần submit nào).
+    """
+    _khoa_main = threading.Lock()
+
+    def start(self):
+        with self._khoa_main:
+            main = sys.modules['__main__']
+            sys.modules['__main__'] = types.ModuleType('__main__')
+            try:
+                super().start()
+            finally:
+                sys.modules['__main__'] = main
+
+
+class _NguCanhForkServer(multiprocessing.context.ForkServerContext):
+    Process = _TienTrinhForkServer
+
+
+def tao_pool_tien_trinh(max_workers):
+    """ProcessPoolExecutor khởi động bằng forkserver, an toàn khi gọi từ chương trình nhiều thread."""
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=_NguCanhForkServer())
+
+
+def doc_file_diem(file_name, file_bytes):
+    """Đọc một file điểm (CSV/Excel) từ nội dung bytes."""
+    if file_name.lower().endswith('.csv'):
+        return pd.read_csv(BytesIO(file_bytes))
+    return pd.read_excel(BytesIO(file_bytes))
+
+
+# --- Khóa nhận diện một bản ghi sinh viên trong một học phần ---
+KEY_COLS = ['Tên học phần', 'IDSV']
+
+
+def khoa_sinh_vien(df_in):
+    """Tạo MultiIndex ('Tên học phần', 'IDSV') đã chuẩn hóa để tra cứu trùng bằng bảng băm."""
+    ten_hp = df_in['Tên học phần'].astype(str).str.strip()
+    # IDSV có thể được đọc thành số thực (101340.0) ở file Excel và chuỗi ở file CSV
+    idsv = df_in['IDSV'].astype(str).str.strip().str.replace(r'\.0$', '', regex=True)
+    return pd.MultiIndex.from_arrays([ten_hp, idsv], names=KEY_COLS)
+
+
+def kho_du_lieu_rong():
+    """Kho dữ liệu đã gộp: DataFrame + chỉ mục băm khóa SV -> vị trí dòng trong DataFrame."""
+    return {
+        'df': None,
+        'keys': pd.MultiIndex.from_arrays([[], []], names=KEY_COLS),
+        'rows': np.array([], dtype=int),
+        'nguon': np.array([], dtype=object),
+        'files': [],
+        'cot_file': {},
+        'trung': [],
+    }
+
+
+def gop_file_moi(kho, df_moi, ma_file):
+    """Gộp df_moi (file có mã nội dung ma_file) vào kho, bỏ các bản ghi trùng khóa ('Tên học phần', 'IDSV').
+
+    Chỉ các dòng của df_moi được băm và tra cứu trong chỉ mục của kho, dữ liệu đã gộp
+    không bị xử lý lại. Bản ghi xuất hiện trước được giữ lại; các bản ghi bị bỏ qua được
+    thêm vào kho['trung'] kèm cờ cho biết điểm có mâu thuẫn với bản ghi được giữ hay không.
+    """
+    df_goc = kho['df']
+    n_goc = 0 if df_goc is None else len(df_goc)
+    # Các cột thực có trong từng file (theo mã nội dung), để không so sánh ô mà file của bản ghi được giữ không có
+    cot_file = {**kho['cot_file'], ma_file: set(df_moi.columns)}
+
+    # File không có cột IDSV được gộp nguyên trạng (không kiểm tra trùng)
+    co_khoa = df_moi['IDSV'].notna().to_numpy() if 'IDSV' in df_moi.columns else np.zeros(len(df_moi), dtype=bool)
+    pos_khoa = np.flatnonzero(co_khoa)
+    keys_moi = khoa_sinh_vien(df_moi.iloc[pos_khoa]) if co_khoa.any() else kho_du_lieu_rong()['keys']
+
+    # Bản ghi mới = chưa có trong kho và là lần xuất hiện đầu tiên trong file
+    moi_that = (kho['keys'].get_indexer(keys_moi) < 0) & ~keys_moi.duplicated(keep='first')
+
+    giu_lai = ~co_khoa
+    giu_lai[pos_khoa[moi_that]] = True
+    pos_giu = np.flatnonzero(giu_lai)
+
+    df_gop = df_moi.iloc[pos_giu] if df_goc is None else pd.concat([df_goc, df_moi.iloc[pos_giu]], ignore_index=True)
+    df_gop = df_gop.reset_index(drop=True)
+    keys_gop = kho['keys'].append(keys_moi[moi_that])
+    rows_gop = np.concatenate([kho['rows'], n_goc + np.searchsorted(pos_giu, pos_khoa[moi_that])])
+    nguon_gop = np.concatenate([kho['nguon'], np.full(len(pos_giu), ma_file, dtype=object)])
+
+    # --- Bản ghi trùng: so sánh điểm với bản ghi được giữ để phát hiện mâu thuẫn ---
+    ds_trung = []
+    if (~moi_that).any():
+        keys_trung = keys_moi[~moi_that]
+        dong_giu = rows_gop[keys_gop.get_indexer(keys_trung)]
+        dong_bo = pos_khoa[~moi_that]
+        nguon_giu = nguon_gop[dong_giu]
+
+        # Chỉ so sánh cột điểm; sai số làm tròn (Excel <-> CSV) không tính là mâu thuẫn
+        cot_so_sanh = lay_cot_diem(df_moi)
+        a = df_gop.iloc[dong_giu][cot_so_sanh].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        b = df_moi.iloc[dong_bo][cot_so_sanh].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        co_cot = np.zeros(a.shape, dtype=bool)
+        for ma in set(nguon_giu):
+            co_cot[nguon_giu == ma] = np.isin(cot_so_sanh, list(cot_file[ma]))
+        khac = ~np.isclose(a, b, equal_nan=True) & co_cot
+
+        # Tên hiển thị của file lấy từ cột 'File nguồn' nếu có, nếu không dùng mã nội dung file
+        ten_giu = df_gop['File nguồn'].to_numpy()[dong_giu] if 'File nguồn' in df_gop.columns else nguon_giu
+        ten_bo = df_moi['File nguồn'].to_numpy()[dong_bo] if 'File nguồn' in df_moi.columns else ma_file
+        ds_trung.append(pd.DataFrame({
+            'Tên học phần': keys_trung.get_level_values(0),
+            'IDSV': keys_trung.get_level_values(1),
+            'File giữ lại': ten_giu,
+            'File bị bỏ qua': ten_bo,
+            'Mâu thuẫn điểm': khac.any(axis=1),
+        }))
+
+    return {
+        'df': df_gop,
+        'keys': keys_gop,
+        'rows': rows_gop,
+        'nguon': nguon_gop,
+        'files': kho['files'] + [ma_file],
+        'cot_file': cot_file,
+        'trung': kho['trung'] + ds_trung,
+    }
+
+
+def lay_cot_diem(df_hp):
+    """Các cột điểm thực sự có dữ liệu (ít nhất một giá trị số) của một học phần."""
+    return [c for c in df_hp.columns
+            if c not in IGNORE_COLS and pd.to_numeric(df_hp[c], errors='coerce').notna().sum() > 0]
+
+
+def tach_cau_hoi(raw_q):
+    """Danh sách câu hỏi của một CĐR, từ chuỗi 'Câu 1, Câu 2' hoặc list."""
+    if isinstance(raw_q, str):
+        return [q.strip() for q in raw_q.split(',') if q.strip()]
+    if isinstance(raw_q, (list, tuple, np.ndarray)):
+        return list(raw_q)
+    return []
+
+
+def bang_khai_bao_cdr(ds_cdr, max_scores):
+    """Bảng khai báo CĐR (cùng cột với giao diện) từ danh sách dict CĐR."""
+    rows = []
+    for r in ds_cdr:
+        cau_hoi = tach_cau_hoi(r.get("Câu hỏi"))
+        tile_min = float(r.get("Tỷ lệ điểm tối thiểu (%)", 40.0))
+        diem_tb_max = np.mean([max_scores.get(q, 0) for q in cau_hoi]) if cau_hoi else 0.0
+        rows.append({
+            "Tên CĐR": r["Tên CĐR"],
+            "Nội dung": r.get("Nội dung", ""),
+            "Câu hỏi": ", ".join(cau_hoi),
+            "Tỷ lệ điểm tối thiểu (%)": tile_min,
+            "Điểm tối thiểu": round(diem_tb_max * tile_min / 100, 2),
+            "Tỷ lệ kỳ vọng (%)": float(r.get("Tỷ lệ kỳ vọng (%)", 75.0)),
+        })
+    return pd.DataFrame(rows)
+
+
+def kiem_tra_du_lieu(df_in, cot_diem, diem_toi_da, cdr_map):
+    """Kiểm tra toàn bộ ma trận điểm với vector điểm tối đa trong một lượt.
+
+    Trả về (df_diem, df_loi): df_diem là ma trận điểm dạng số (ô không phải số -> NaN),
+    df_loi là bảng bất thường (tọa độ ô, quy tắc vi phạm, giá trị gốc).
+    """
+    raw = df_in[cot_diem]
+    df_diem = raw.apply(pd.to_numeric, errors='coerce')
+
+    X = df_diem.to_numpy(dtype=float)
+    trong = raw.isna().to_numpy()
+    max_vec = np.array([diem_toi_da[c] for c in cot_diem], dtype=float)
+    cau_hoi_cdr = {q for v in cdr_map.values() for q in v["Câu hỏi"]}
+    thuoc_cdr = np.array([c in cau_hoi_cdr for c in cot_diem], dtype=bool)
+
+    # So sánh NaN luôn cho False nên ô trống không bị tính là âm/vượt điểm tối đa
+    quy_tac = {
+        "Không phải số": ~trong & np.isnan(X),
+        "Điểm âm": X < 0,
+        "Vượt điểm tối đa": X > max_vec,
+        "Thiếu điểm câu hỏi thuộc CĐR": trong & thuoc_cdr,
+    }
+
+    raw_np = raw.to_numpy(dtype=object)
+    idsv = df_in['IDSV'].to_numpy(dtype=object) if 'IDSV' in df_in.columns else np.full(len(df_in), None)
+    nguon = df_in['File nguồn'].to_numpy(dtype=object) if 'File nguồn' in df_in.columns else np.full(len(df_in), None)
+    cot_np = np.array(cot_diem, dtype=object)
+    phan = []
+    for ten, mask in quy_tac.items():
+        r, c = np.nonzero(mask)
+        phan.append(pd.DataFrame({
+            "Dòng": df_in.index.to_numpy()[r],
+            "File nguồn": nguon[r],
+            "IDSV": idsv[r],
+            "Câu hỏi": cot_np[c],
+            "Quy tắc": ten,
+            "Giá trị": raw_np[r, c],
+        }))
+    df_loi = pd.concat(phan, ignore_index=True)
+    return df_diem, df_loi
+
+
+def xep_loai(diem_10):
+    """Xếp loại A–F theo điểm hệ 10, dùng chung cho bảng phân loại học phần và phiếu từng SV.
+
+    Điểm thiếu hoặc vượt 10 (điểm tối đa khai báo thấp hơn điểm thực tế) không được xếp loại ("-").
+    """
+    if diem_10 is None or np.isnan(diem_10) or diem_10 > 10:
+        return "-"
+    if diem_10 >= 8.5:
+        return "A"
+    if diem_10 >= 7.0:
+        return "B"
+    if diem_10 >= 5.5:
+        return "C"
+    if diem_10 >= 4.0:
+        return "D"
+    return "F"
+
+
+def diem_theo_cdr(df_diem, cau_hoi, xu_ly_thieu):
+    """Tổng điểm theo CĐR của các SV được tính, theo cách xử lý thiếu điểm đã chọn."""
+    khoi = df_diem[[q for q in cau_hoi if q in df_diem.columns]]
+    if xu_ly_thieu == "exclude":
+        khoi = khoi[khoi.notna().all(axis=1)]
+    elif xu_ly_thieu == "mean":
+        khoi = khoi.fillna(khoi.mean())
+    return khoi.fillna(0).sum(axis=1)
+
+
+def thong_ke_dat_cdr(df_diem, df_cdr, max_scores, xu_ly_thieu):
+    """Bảng thống kê số/tỷ lệ SV đạt điểm tối thiểu của từng CĐR so với tỷ lệ kỳ vọng."""
+    results = []
+    for _, row in df_cdr.iterrows():
+        cdr_name = row["Tên CĐR"]
+        noi_dung = row["Nội dung"]
+        cauhoi_list = [q for q in tach_cau_hoi(row["Câu hỏi"]) if q in df_diem.columns]
+
+        if not cauhoi_list:
+            results.append({
+                "CĐR": cdr_name,
+                "Nội dung": noi_dung,
+                "Điểm tối đa CĐR": "-",
+                "Điểm tối thiểu đạt CĐR": "-",
+                "Số SV được tính": "-",
+                "Tổng SV đạt": "-",
+                "Tỷ lệ SV đạt (%)": "-",
+                "Kết quả": "-"
+            })
+            continue
+
+        # 1. Điểm tối đa CĐR = tổng điểm tối đa các câu hỏi
+        diem_toi_da_cdr = sum([max_scores.get(q, 0) for q in cauhoi_list])
+
+        # 2. Điểm tối thiểu đạt CĐR (tính theo % nếu có nhiều câu hỏi)
+        diem_toi_thieu_cdr = row["Điểm tối thiểu"]
+        if len(cauhoi_list) > 1:
+            diem_toi_thieu_cdr = sum([max_scores[q] * (row["Tỷ lệ điểm tối thiểu (%)"] / 100) for q in cauhoi_list])
+
+        # 3. Tổng điểm thực tế sinh viên theo CĐR (theo cách xử lý thiếu điểm đã chọn)
+        tong_cdr = diem_theo_cdr(df_diem, cauhoi_list, xu_ly_thieu)
+        tong_sv = len(tong_cdr)
+
+        # 4. Tính số SV đạt và tỷ lệ đạt
+        sv_dat = (tong_cdr >= diem_toi_thieu_cdr).sum()
+        tyle_dat = round((sv_dat / tong_sv) * 100, 2) if tong_sv > 0 else 0
+
+        # 5. Kết quả đo lường CĐR (so với tỷ lệ kỳ vọng của chính CĐR này)
+        nhan_xet = "ĐẠT ✅" if tyle_dat >= row["Tỷ lệ kỳ vọng (%)"] else "KHÔNG ĐẠT ❌"
+
+        results.append({
+            "CĐR": cdr_name,
+            "Nội dung": noi_dung,
+            "Điểm tối đa CĐR": round(diem_toi_da_cdr, 2),
+            "Điểm tối thiểu đạt CĐR": round(diem_toi_thieu_cdr, 2),
+            "Số SV được tính": int(tong_sv),
+            "Tổng SV đạt": int(sv_dat),
+            "Tỷ lệ SV đạt (%)": tyle_dat,
+            "Kết quả": nhan_xet,
+        })
+
+    df_thongke = pd.DataFrame(results)
+    df_thongke.index = np.arange(1, len(df_thongke) + 1)
+    df_thongke.reset_index(inplace=True)
+    df_thongke.rename(columns={"index": "TT"}, inplace=True)
+    return df_thongke
+
+
+def phan_loai_cdr(df_diem, df_cdr, max_scores, xu_ly_thieu):
+    """Bảng phân loại A–B–C–D–F theo CĐR và điểm từng SV theo CĐR.
+
+    Trả về (df_phanloai, diem_sv) với diem_sv là danh sách
+    (CĐR, tổng điểm SV, điểm hệ 10 SV, điểm tối đa CĐR); hai Series điểm có chỉ mục của df_diem
+    và chỉ chứa các SV được tính.
+    """
+    total_sv = len(df_diem)
+    rows = []
+    diem_sv = []
+
+    for _, r in df_cdr.iterrows():
+        cdr_key = r.get('Tên CĐR') or r.get('CĐR') or r.get('CLO')
+        if not cdr_key:
+            continue
+
+        cau_hoi = [q for q in tach_cau_hoi(r.get('Câu hỏi', '')) if q in df_diem.columns]
+
+        if len(cau_hoi) == 0:
+            rows.append({
+                "Ký hiệu CĐR": cdr_key,
+                "Tổng số SV": total_sv,
+                "Loại A (Đạt)": 0, "Loại B (Đạt)": 0, "Loại C (Đạt)": 0, "Loại D (Đạt)": 0, "Loại F (Không đạt)": 0,
+                "Tỷ lệ A (Đạt) (%)": 0, "Tỷ lệ B (Đạt) (%)": 0, "Tỷ lệ C (Đạt) (%)": 0, "Tỷ lệ D (Đạt) (%)": 0, "Tỷ lệ F (Không đạt) (%)": 0
+            })
+            continue
+
+        diem_toi_da_cdr = sum([max_scores.get(q, 0) for q in cau_hoi])
+
+        tong = diem_theo_cdr(df_diem, cau_hoi, xu_ly_thieu)
+        so_sv_cdr = len(tong)
+        qd = (tong / diem_toi_da_cdr) * 10 if diem_toi_da_cdr > 0 else tong * 0.0
+        diem_sv.append((cdr_key, tong, qd, diem_toi_da_cdr))
+
+        loai = qd.map(xep_loai)
+        A, B, C, D, F = ((loai == l).sum() for l in LOAI_AF)
+
+        pct = lambda x: round((x / so_sv_cdr) * 100, 2) if so_sv_cdr > 0 else 0.0
+        A_pct, B_pct, C_pct, D_pct, F_pct = map(pct, [A, B, C, D, F])
+
+        rows.append({
+            "Ký hiệu CĐR": cdr_key,
+            "Tổng số SV": so_sv_cdr,
+            "Loại A (Đạt)": int(A), "Loại B (Đạt)": int(B), "Loại C (Đạt)": int(C), "Loại D (Đạt)": int(D), "Loại F (Không đạt)": int(F),
+            "Tỷ lệ A (Đạt) (%)": A_pct, "Tỷ lệ B (Đạt) (%)": B_pct, "Tỷ lệ C (Đạt) (%)": C_pct, "Tỷ lệ D (Đạt) (%)": D_pct, "Tỷ lệ F (Không đạt) (%)": F_pct
+        })
+
+    return pd.DataFrame(rows), diem_sv
+
+
+def tinh_plo(diem_cdr_hp, df_map):
+    """Điểm PLO (hệ 10) của từng SV qua tất cả học phần bằng tích ma trận thưa.
+
+    diem_cdr_hp: {học phần: DataFrame điểm CĐR hệ 10 (index IDSV, mỗi cột một CĐR)}; df_map có các cột
+    Học phần, CĐR, PLO, Trọng số. Tên học phần và CĐR được so khớp dưới dạng chuỗi ở cả hai phía.
+    S (SV x (học phần, CĐR)) chứa điểm CĐR hệ 10, M đánh dấu ô có điểm, W ((học phần, CĐR) x PLO)
+    chứa trọng số. Điểm PLO = (S @ W) / (M @ W): trung bình có trọng số trên các CĐR SV thực sự có điểm.
+    """
+    cap_cdr = pd.MultiIndex.from_tuples(
+        [(str(hp), str(cdr)) for hp, bang in diem_cdr_hp.items() for cdr in bang.columns], names=["Học phần", "CĐR"])
+    ma_sv = pd.Index(pd.unique(np.concatenate([bang.index.to_numpy(dtype=object) for bang in diem_cdr_hp.values()])), name="IDSV")
+
+    # --- Ma trận điểm S và mặt nạ M dạng thưa, dựng từ tọa độ các ô có điểm ---
+    dong, cot, gia_tri = [], [], []
+    for hp, bang in diem_cdr_hp.items():
+        X = bang.to_numpy(dtype=float)
+        r, c = np.nonzero(~np.isnan(X))
+        dong.append(ma_sv.get_indexer(bang.index)[r])
+        cot.append(cap_cdr.get_indexer(pd.MultiIndex.from_arrays([np.full(len(bang.columns), str(hp), dtype=object), bang.columns.astype(str)]))[c])
+        gia_tri.append(X[r, c])
+    dong, cot, gia_tri = np.concatenate(dong), np.concatenate(cot), np.concatenate(gia_tri)
+    S = sparse.csr_matrix((gia_tri, (dong, cot)), shape=(len(ma_sv), len(cap_cdr)))
+    M = sparse.csr_matrix((np.ones_like(gia_tri), (dong, cot)), shape=(len(ma_sv), len(cap_cdr)))
+
+    # --- Ma trận trọng số W: (học phần, CĐR) -> PLO ---
+    df_map = df_map.dropna(subset=["Học phần", "CĐR", "PLO"])
+    df_map = df_map[(df_map["PLO"].astype(str).str.strip() != "") & (pd.to_numeric(df_map["Trọng số"], errors='coerce') > 0)]
+    vi_tri = cap_cdr.get_indexer(pd.MultiIndex.from_arrays([df_map["Học phần"].astype(str), df_map["CĐR"].astype(str)]))
+    hop_le = vi_tri >= 0
+    ma_plo, ten_plo = pd.factorize(df_map["PLO"].astype(str).str.strip()[hop_le], sort=True)
+    W = sparse.csr_matrix(
+        (pd.to_numeric(df_map["Trọng số"])[hop_le].to_numpy(dtype=float), (vi_tri[hop_le], ma_plo)),
+        shape=(len(cap_cdr), len(ten_plo)))
+
+    tu_so = (S @ W).toarray()
+    mau_so = (M @ W).toarray()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        diem_plo = np.where(mau_so > 0, tu_so / mau_so, np.nan)
+    df_plo_sv = pd.DataFrame(diem_plo, index=ma_sv, columns=list(ten_plo))
+
+    # Số học phần đóng góp cho từng PLO
+    hp_plo = pd.DataFrame({"Học phần": cap_cdr.get_level_values(0)[vi_tri[hop_le]], "PLO": ten_plo[ma_plo]}) \
+        .groupby("PLO")["Học phần"].nunique()
+    df_plo = pd.DataFrame({
+        "PLO": list(ten_plo),
+        "Số học phần": hp_plo.reindex(ten_plo).fillna(0).astype(int).to_numpy(),
+        "Số SV": df_plo_sv.notna().sum().to_numpy(),
+        "Điểm TB (hệ 10)": df_plo_sv.mean().round(2).to_numpy(),
+        # Đạt = loại D trở lên (điểm hệ 10 >= 4.0), giống bảng phân loại CĐR
+        "Tỷ lệ SV đạt (%)": (100 * (df_plo_sv >= 4.0).sum() / df_plo_sv.notna().sum().replace(0, np.nan)).round(2).fillna(0).to_numpy(),
+    })
+    return df_plo_sv, df_plo
+
+
+def du_lieu_bieu_do_ty_le(df_thongke, df_cdr):
+    """Dữ liệu tổng hợp cho biểu đồ tỷ lệ SV đạt CĐR so với tỷ lệ kỳ vọng (mỗi CĐR một giá trị)."""
+    ky_vong = dict(zip(df_cdr["Tên CĐR"], df_cdr["Tỷ lệ kỳ vọng (%)"]))
+    ty_le = pd.to_numeric(df_thongke["Tỷ lệ SV đạt (%)"], errors='coerce')
+    return {
+        "cdr": df_thongke["CĐR"].astype(str).tolist(),
+        "ty_le_dat": [None if pd.isna(v) else float(v) for v in ty_le],
+        "ky_vong": [float(ky_vong.get(c, 0)) for c in df_thongke["CĐR"]],
+    }
+
+
+def du_lieu_bieu_do_af(df_phanloai):
+    """Dữ liệu tổng hợp cho biểu đồ phân bố A–F: tỷ lệ từng loại theo CĐR."""
+    return {
+        "cdr": df_phanloai["Ký hiệu CĐR"].astype(str).tolist(),
+        **{loai: df_phanloai[cot].astype(float).tolist() for loai, cot in zip(LOAI_AF, COT_TY_LE_AF)},
+    }
+
+
+def histogram_cdr(diem_sv, so_khoang=10):
+    """Phân bố điểm hệ 10 của từng CĐR, đã gom khoảng bằng np.histogram trên [0, 10]."""
+    bien = np.linspace(0, 10, so_khoang + 1)
+    ket_qua = []
+    for cdr_key, _, qd, _ in diem_sv:
+        # Điểm vượt 10 (do nhập vượt điểm tối đa) được gom vào khoảng cuối
+        dem, _ = np.histogram(np.clip(qd.dropna().to_numpy(dtype=float), 0, 10), bins=bien)
+        ket_qua.append({"cdr": str(cdr_key), "so_sv": dem.tolist(), "bien": bien.tolist()})
+    return ket_qua
+
+
+def anh_bieu_do_ty_le(du_lieu, hoc_phan):
+    """Ảnh PNG (bytes) biểu đồ tỷ lệ SV đạt CĐR, dùng cho báo cáo Word."""
+    fig = Figure(figsize=(10, 5))
+    ax = fig.subplots()
+    ty_le = [np.nan if v is None else v for v in du_lieu["ty_le_dat"]]
+
+    # Cột tỷ lệ đạt và đường tỷ lệ kỳ vọng
+    bars = ax.bar(du_lieu["cdr"], ty_le, color="#4CAF50", alpha=0.85, label="Tỷ lệ SV đạt (%)")
+    ax.plot(du_lieu["cdr"], du_lieu["ky_vong"], color="orange", marker="o", linewidth=2, label="Tỷ lệ kỳ vọng (%)")
+
+    # Hiển thị giá trị phần trăm trên đầu cột
+    for bar in bars:
+        height = bar.get_height()
+        if not np.isnan(height):
+            ax.text(bar.get_x() + bar.get_width() / 2, height + 1, f"{height:.1f}%",
+                    ha="center", va="bottom", fontsize=10, fontweight="bold")
+
+    ax.set_xlabel("Chuẩn đầu ra (CĐR)", fontsize=11)
+    ax.set_ylabel("Tỷ lệ sinh viên đạt (%)", fontsize=11)
+    ax.set_ylim(0, 110)
+    ax.set_title(f"Tỷ lệ sinh viên đạt CĐR – {hoc_phan}", fontsize=13, fontweight="bold")
+    ax.legend(loc="upper left", bbox_to_anchor=(1, 1))
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+
+    buffer = BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    return buffer.getvalue()
+
+
+def anh_bieu_do_af(du_lieu, hoc_phan):
+    """Ảnh PNG (bytes) biểu đồ cột chồng phân bố A–F theo CĐR, dùng cho báo cáo Word."""
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    bottom = np.zeros(len(du_lieu["cdr"]))
+
+    for loai, cot, mau in zip(LOAI_AF, COT_TY_LE_AF, MAU_AF):
+        vals = np.array(du_lieu[loai], dtype=float)
+        ax.bar(du_lieu["cdr"], vals, bottom=bottom, color=mau, label=cot)
+        # Chỉ hiển thị giá trị trong cột nếu đủ lớn
+        for i, val in enumerate(vals):
+            if val >= 3:
+                ax.text(i, bottom[i] + val / 2, f"{val:.1f}%", ha='center', va='center', fontsize=9)
+        bottom += vals
+
+    ax.set_ylabel("Tỷ lệ (%)", fontsize=11)
+    ax.set_ylim(0, 100)
+    ax.set_xlabel("Ký hiệu CĐR", fontsize=11)
+    ax.set_title(f"Phân bố A–B–C–D–F theo CĐR – {hoc_phan}", fontsize=13, fontweight="bold")
+    ax.legend(title="Phân loại", loc="upper left", bbox_to_anchor=(1.02, 1), borderaxespad=0,
+              fontsize=10, title_fontsize=11)
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+
+    buffer = BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    return buffer.getvalue()
+
+
+def xuat_excel(df_thongke, df_phanloai):
+    """File Excel gồm bảng thống kê đạt CĐR và bảng phân loại A–F."""
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
+        df_thongke.to_excel(writer, index=False, sheet_name='ThongKe_CDR')
+        worksheet = writer.sheets['ThongKe_CDR']
+        worksheet.set_column('A:A', 5)   # TT
+        worksheet.set_column('B:B', 10)  # CĐR
+        worksheet.set_column('C:C', 60)  # Nội dung CĐR
+        worksheet.set_column('D:G', 18)  # Các cột điểm và SV
+
+        df_phanloai.to_excel(writer, index=False, sheet_name='PhanLoai_CDR')
+        ws = writer.sheets['PhanLoai_CDR']
+        ws.set_column('A:A', 14)
+        ws.set_column('B:B', 12)
+        ws.set_column('C:G', 10)
+        ws.set_column('H:L', 14)
+    return buffer.getvalue()
+
+
+def _them_bang(doc, df_bang):
+    """Thêm một DataFrame vào tài liệu Word dưới dạng bảng có dòng tiêu đề in đậm."""
+    table = doc.add_table(rows=1, cols=len(df_bang.columns))
+    table.style = 'Table Grid'
+    hdr = table.rows[0].cells
+    for j, col in enumerate(df_bang.columns):
+        run = hdr[j].paragraphs[0].add_run(str(col))
+        run.bold = True
+        hdr[j].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
+    for _, row in df_bang.iterrows():
+        cells = table.add_row().cells
+        for j, val in enumerate(row):
+            cells[j].text = str(val)
+
+
+def tao_bao_cao_word(hoc_phan, so_sv, df_cdr, df_thongke, df_phanloai,
+                     nhanxet="", dexuat="", hinh_ty_le_cdr=None, hinh_af=None):
+    """Báo cáo CLO dạng Word (bytes). Hai biểu đồ là ảnh PNG (bytes), có thể bỏ trống."""
+    doc = Document()
+
+    # Cài đặt style font
+    style = doc.styles['Normal']
+    style.font.name = 'Times New Roman'
+    style.element.rPr.rFonts.set(qn('w:eastAsia'), 'Times New Roman')
+    style.font.size = Pt(12)
+
+    # ==================== PHẦN I ====================
+    doc.add_heading("PHẦN I. THÔNG TIN CHUNG", level=1)
+    doc.add_paragraph(f"📘 Tên học phần: {hoc_phan}")
+    doc.add_paragraph(f"👨‍🎓 Số lượng sinh viên: {so_sv}")
+    doc.add_paragraph("Tổng hợp thông tin CĐR đã khai báo:")
+    _them_bang(doc, df_cdr)
+
+    # ==================== PHẦN II ====================
+    doc.add_heading("PHẦN II. PHÂN TÍCH THỐNG KÊ KẾT QUẢ ĐẠT CHUẨN ĐẦU RA", level=1)
+
+    doc.add_paragraph("1️⃣ Bảng thống kê mức độ đạt CĐR:")
+    if df_thongke is not None:
+        _them_bang(doc, df_thongke)
+    else:
+        doc.add_paragraph("⚠️ Chưa có dữ liệu thống kê mức độ đạt CĐR.")
+
+    doc.add_paragraph("2️⃣ Biểu đồ tỷ lệ sinh viên đạt Chuẩn đầu ra (CĐR) so với tỷ lệ kỳ vọng:")
+    if hinh_ty_le_cdr is not None:
+        doc.add_picture(BytesIO(hinh_ty_le_cdr), width=Inches(6))
+    else:
+        doc.add_paragraph("⚠️ Không thể chèn biểu đồ tỷ lệ đạt CĐR.")
+
+    # ==================== PHẦN III ====================
+    doc.add_heading("PHẦN III. THỐNG KÊ PHÂN LOẠI NGƯỜI HỌC ĐẠT CĐR", level=1)
+
+    doc.add_paragraph("1️⃣ Bảng phân loại A–B–C–D–F theo CĐR (số lượng & tỷ lệ):")
+    if df_phanloai is not None:
+        _them_bang(doc, df_phanloai)
+    else:
+        doc.add_paragraph("⚠️ Chưa có dữ liệu phân loại A–F để hiển thị.")
+
+    doc.add_paragraph("2️⃣ Biểu đồ phân bố điểm A–B–C–D–F theo CĐR:")
+    if hinh_af is not None:
+        doc.add_picture(BytesIO(hinh_af), width=Inches(6))
+    else:
+        doc.add_paragraph("⚠️ Không thể chèn biểu đồ A–F.")
+
+    # ==================== PHẦN IV ====================
+    doc.add_heading("PHẦN IV. NHẬN XÉT – ĐỀ XUẤT AI", level=1)
+    doc.add_paragraph(f"1️⃣ Nhận xét: {nhanxet}")
+    doc.add_paragraph(f"2️⃣ Đề xuất: {dexuat}")
+
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def chay_pipeline(df, hoc_phan, max_scores, ds_cdr, xu_ly_thieu="zero"):
+    """Chạy toàn bộ các bước cho một học phần: kiểm tra dữ liệu, thống kê đạt CĐR, phân loại A–F.
+
+    max_scores thiếu câu nào thì câu đó lấy điểm tối đa mặc định 1.0 như trên giao diện;
+    hoc_phan có thể bỏ trống nếu dữ liệu chỉ có một học phần.
+    """
+    if 'Tên học phần' not in df.columns:
+        raise ValueError("Dữ liệu chưa có cột 'Tên học phần'.")
+    if xu_ly_thieu not in XU_LY_THIEU:
+        raise ValueError(f"Cách xử lý thiếu điểm không hợp lệ: {xu_ly_thieu}")
+
+    if hoc_phan is None:
+        ds_hp = df['Tên học phần'].dropna().unique().tolist()
+        if len(ds_hp) != 1:
+            raise ValueError("Dữ liệu có nhiều học phần, vui lòng chọn 'hoc_phan'.")
+        hoc_phan = ds_hp[0]
+
+    df_hp = df[df['Tên học phần'] == hoc_phan].copy()
+    if df_hp.empty:
+        raise ValueError(f"Không có dữ liệu cho học phần '{hoc_phan}'.")
+    cot_diem = lay_cot_diem(df_hp)
+    if not cot_diem:
+        raise ValueError("Không tìm thấy cột điểm hợp lệ nào trong dữ liệu học phần này.")
+
+    max_scores = {q: float(max_scores.get(q, 1.0)) for q in cot_diem}
+    df_cdr = bang_khai_bao_cdr(ds_cdr, max_scores)
+    cdr_map = {r["Tên CĐR"]: {"Câu hỏi": tach_cau_hoi(r["Câu hỏi"])} for _, r in df_cdr.iterrows()}
+
+    df_diem, df_loi = kiem_tra_du_lieu(df_hp, cot_diem, max_scores, cdr_map)
+    df_thongke = thong_ke_dat_cdr(df_diem, df_cdr, max_scores, xu_ly_thieu)
+    df_phanloai, diem_sv = phan_loai_cdr(df_diem, df_cdr, max_scores, xu_ly_thieu)
+
+    return {
+        "hoc_phan": hoc_phan,
+        "so_sv": len(df_hp),
+        "df_hp": df_hp,
+        "df_cdr": df_cdr,
+        "df_loi": df_loi,
+        "df_thongke": df_thongke,
+        "df_phanloai": df_phanloai,
+        "diem_sv": diem_sv,
+    }
@@ -0,0 +1,153 @@
+"""Tạo phiếu kết quả đạt CĐR cho từng sinh viên và đóng gói thành file ZIP.
+
+Các hàm ở đây được tách khỏi script Streamlit để có thể chạy trong ProcessPoolExecutor
+(hàm chạy trong tiến trình con phải import được theo tên module).
+"""
+
+import io
+import math
+import os
+import re
+import zipfile
+from collections import deque
+
+import pandas as pd
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml.ns import qn
+from docx.shared import Cm, Pt
+
+from clo_pipeline import tao_pool_tien_trinh, xep_loai
+
+# Thông tin sinh viên in trên phiếu
+COT_THONG_TIN_SV = ['IDSV', 'Họ và tên SV', 'Lớp']
+
+
+def ten_file_phieu(stt, sv):
+    """Tên file phiếu trong ZIP: số thứ tự + IDSV + họ tên (đã bỏ ký tự không hợp lệ)."""
+    ten = f"{stt:05d}_{sv.get('IDSV') or 'SV'}_{sv.get('Họ và tên SV') or ''}".strip("_ ")
+    return re.sub(r'[\\/:*?"<>|\s]+', "_", ten) + ".docx"
+
+
+def ds_phieu_sinh_vien(df_hp, diem_sv):
+    """Sinh lần lượt dict thông tin và điểm CĐR của từng SV trong df_hp (đầu vào của tao_zip_phieu).
+
+    diem_sv là danh sách (CĐR, tổng điểm SV, điểm hệ 10 SV, điểm tối đa CĐR) như phan_loai_cdr trả về;
+    SV không được tính ở một CĐR có điểm NaN. Chỉ các mảng điểm (một số thực mỗi SV mỗi CĐR) được
+    dựng trước; dict của từng SV được tạo khi được lấy ra.
+    """
+    diem = [(k, tong.reindex(df_hp.index).to_numpy(dtype=float), qd.reindex(df_hp.index).to_numpy(dtype=float), m)
+            for k, tong, qd, m in diem_sv]
+    thong_tin = df_hp.reindex(columns=COT_THONG_TIN_SV).itertuples(index=False, name=None)
+    for i, dong in enumerate(thong_tin):
+        sv = {c: None if pd.isna(v) else v for c, v in zip(COT_THONG_TIN_SV, dong)}
+        if sv['IDSV'] is not None:
+            sv['IDSV'] = str(sv['IDSV']).removesuffix('.0')
+        yield {**sv, "CĐR": [
+            {"CĐR": k, "Tổng điểm": float(tong[i]), "Điểm tối đa": float(m), "Điểm hệ 10": float(qd[i])}
+            for k, tong, qd, m in diem
+        ]}
+
+
+def tao_phieu_sinh_vien(args):
+    """Tạo phiếu Word (A4) cho một sinh viên; trả về (tên file, nội dung bytes).
+
+    args = (stt, sv, hoc_phan) với sv là dict gồm thông tin SV và danh sách 'CĐR'
+    (mỗi phần tử có 'CĐR', 'Tổng điểm', 'Điểm tối đa', 'Điểm hệ 10').
+    """
+    stt, sv, hoc_phan = args
+
+    doc = Document()
+    section = doc.sections[0]
+    section.page_width, section.page_height = Cm(21), Cm(29.7)
+    section.left_margin = section.right_margin = Cm(2)
+
+    style = doc.styles['Normal']
+    style.font.name = 'Times New Roman'
+    style.element.rPr.rFonts.set(qn('w:eastAsia'), 'Times New Roman')
+    style.font.size = Pt(12)
+
+    tieu_de = doc.add_heading("PHIẾU KẾT QUẢ ĐẠT CHUẨN ĐẦU RA HỌC PHẦN", level=1)
+    tieu_de.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    doc.add_paragraph(f"Tên học phần: {hoc_phan}")
+    doc.add_paragraph(f"Mã sinh viên: {sv.get('IDSV') or ''}")
+    doc.add_paragraph(f"Họ và tên: {sv.get('Họ và tên SV') or ''}")
+    doc.add_paragraph(f"Lớp: {sv.get('Lớp') or ''}")
+
+    cot = ["CĐR", "Tổng điểm", "Điểm tối đa", "Điểm hệ 10", "Xếp loại"]
+    table = doc.add_table(rows=1, cols=len(cot))
+    table.style = 'Table Grid'
+    for j, col_name in enumerate(cot):
+        p = table.rows[0].cells[j].paragraphs[0]
+        p.add_run(col_name).bold = True
+        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    for r in sv["CĐR"]:
+        diem_10 = r["Điểm hệ 10"]
+        co_diem = diem_10 is not None and not math.isnan(diem_10)
+        cells = table.add_row().cells
+        cells[0].text = str(r["CĐR"])
+        cells[1].text = f"{r['Tổng điểm']:.2f}" if co_diem else "-"
+        cells[2].text = f"{r['Điểm tối đa']:.2f}"
+        cells[3].text = f"{diem_10:.2f}" if co_diem else "-"
+        cells[4].text = xep_loai(diem_10)
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return ten_file_phieu(stt, sv), buffer.getvalue()
+
+
+class _LuongGhi(io.RawIOBase):
+    """Luồng chỉ-ghi: zipfile ghi vào, bên ngoài lấy dần dữ liệu ra bằng lay_ra()."""
+
+    def __init__(self):
+        self._buf = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._buf += b
+        return len(b)
+
+    def lay_ra(self):
+        data = bytes(self._buf)
+        self._buf.clear()
+        return data
+
+
+def tao_zip_phieu(ds_sv, hoc_phan, max_workers=None, so_viec_toi_da=None, pool=None):
+    """Sinh nội dung ZIP các phiếu sinh viên theo từng đoạn bytes.
+
+    Phiếu được tạo song song trong ProcessPoolExecutor (tạo riêng bằng tao_pool_tien_trinh, hoặc
+    dùng chung pool được truyền vào); số việc đang chờ được giới hạn nên bộ nhớ không tăng theo
+    số sinh viên. Mỗi phiếu được ghi vào ZIP ngay khi xong và phần dữ liệu ZIP tương ứng được trả ra luôn.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    so_viec_toi_da = so_viec_toi_da or max_workers * 4
+    pool_rieng = pool is None
+    if pool_rieng:
+        pool = tao_pool_tien_trinh(max_workers)
+    luong = _LuongGhi()
+    dang_chay = deque()
+    try:
+        with zipfile.ZipFile(luong, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for stt, sv in enumerate(ds_sv, start=1):
+                dang_chay.append(pool.submit(tao_phieu_sinh_vien, (stt, sv, hoc_phan)))
+                if len(dang_chay) >= so_viec_toi_da:
+                    ten, noi_dung = dang_chay.popleft().result()
+                    zf.writestr(ten, noi_dung)
+                    yield luong.lay_ra()
+            while dang_chay:
+                ten, noi_dung = dang_chay.popleft().result()
+                zf.writestr(ten, noi_dung)
+                yield luong.lay_ra()
+        # Phần central directory được ghi khi đóng ZipFile
+        yield luong.lay_ra()
+    finally:
+        # Dừng giữa chừng (client ngắt kết nối): bỏ các phiếu chưa tạo
+        for fut in dang_chay:
+            fut.cancel()
+        if pool_rieng:
+            pool.shutdown(cancel_futures=True)
@@ -0,0 +1,164 @@
+import http.client
+import io
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+import zipfile
+
+import pytest
+
+from clo_api_server import tao_server
+
+CSV = ("Tên học phần,IDSV,Họ và tên SV,Câu 1,Câu 2\n"
+       "Kinh tế vi mô,1,Nguyễn Văn A,2,1.5\n"
+       "Kinh tế vi mô,2,Trần Thị B,1,\n"
+       "Kinh tế vi mô,3,Lê Văn C,0.5,2\n").encode("utf-8")
+
+
+def goi(url, method="GET", data=None):
+    req = urllib.request.Request(url, data=data, method=method)
+    try:
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            return resp.status, resp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+@pytest.fixture
+def chay_server():
+    servers = []
+
+    def _chay(**kwargs):
+        server = tao_server(port=0, **kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield _chay
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def tai_len(base_url):
+    ma, data = goi(f"{base_url}/uploads?name=diem.csv", "POST", CSV)
+    assert ma == 201
+    return json.loads(data)
+
+
+def cau_hinh(upload_id, tile_min=40):
+    return json.dumps({
+        "upload_id": upload_id,
+        "hoc_phan": "Kinh tế vi mô",
+        "max_scores": {"Câu 1": 2.0, "Câu 2": 2.0},
+        "cdr": [{"Tên CĐR": "CĐR1", "Câu hỏi": ["Câu 1", "Câu 2"], "Tỷ lệ điểm tối thiểu (%)": tile_min}],
+    }, ensure_ascii=False).encode("utf-8")
+
+
+def cho_job(base_url, job_id):
+    han = time.time() + 60
+    while True:
+        job = json.loads(goi(f"{base_url}/jobs/{job_id}")[1])
+        if job["status"] in ("xong", "loi") or time.time() > han:
+            break
+        time.sleep(0.05)
+    assert job["status"] == "xong", job["loi"]
+    return job
+
+
+def test_upload_job_excel(chay_server):
+    base_url = chay_server(so_worker=1)
+    upload = tai_len(base_url)
+    assert upload["hoc_phan"] == {"Kinh tế vi mô": ["Câu 1", "Câu 2"]}
+
+    ma, data = goi(f"{base_url}/jobs", "POST", cau_hinh(upload["upload_id"]))
+    assert ma == 202
+    job_id = json.loads(data)["job_id"]
+
+    job = cho_job(base_url, job_id)
+    assert job["ket_qua"]["so_sv"] == 3
+    assert job["ket_qua"]["thong_ke"][0]["Số SV được tính"] == 3
+
+    ma, data = goi(f"{base_url}/jobs/{job_id}/excel")
+    assert ma == 200 and data[:2] == b"PK"
+
+    # Cùng phép tính viết khác (câu hỏi dạng chuỗi, ghi rõ giá trị mặc định) dùng lại job đã xong
+    cung_phep_tinh = json.dumps({
+        "upload_id": upload["upload_id"],
+        "hoc_phan": "Kinh tế vi mô",
+        "max_scores": {"Câu 1": 2, "Câu 2": 2},
+        "cdr": [{"Tên CĐR": "CĐR1", "Câu hỏi": "Câu 1, Câu 2", "Tỷ lệ điểm tối thiểu (%)": 40,
+                 "Tỷ lệ kỳ vọng (%)": 75}],
+        "xu_ly_thieu": "zero",
+    }, ensure_ascii=False).encode("utf-8")
+    ma, data = goi(f"{base_url}/jobs", "POST", cung_phep_tinh)
+    assert ma == 200 and json.loads(data)["job_id"] == job_id
+
+
+def test_phieu_zip_gui_dang_luong(chay_server):
+    base_url = chay_server(so_worker=1)
+    job_id = json.loads(goi(f"{base_url}/jobs", "POST", cau_hinh(tai_len(base_url)["upload_id"]))[1])["job_id"]
+    cho_job(base_url, job_id)
+
+    with urllib.request.urlopen(f"{base_url}/jobs/{job_id}/phieu.zip", timeout=60) as resp:
+        assert resp.headers["Transfer-Encoding"] == "chunked"
+        assert resp.headers["Content-Length"] is None
+        data = resp.read()
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        ten = zf.namelist()
+    assert len(ten) == 3 and all(t.endswith(".docx") for t in ten)
+
+
+def test_dang_tao_zip_tra_503(chay_server):
+    base_url = chay_server(so_worker=1, so_zip_toi_da=0)
+    job_id = json.loads(goi(f"{base_url}/jobs", "POST", cau_hinh(tai_len(base_url)["upload_id"]))[1])["job_id"]
+    cho_job(base_url, job_id)
+
+    try:
+        urllib.request.urlopen(f"{base_url}/jobs/{job_id}/phieu.zip", timeout=60)
+    except urllib.error.HTTPError as e:
+        assert e.code == 503 and e.headers["Retry-After"] == "1"
+    else:
+        pytest.fail("phải trả 503 khi đã đủ số ZIP đang tạo")
+    assert json.loads(goi(f"{base_url}/metrics")[1])["zip_tu_choi"] == 1
+
+
+def test_dang_doc_upload_tra_503(chay_server):
+    base_url = chay_server(so_worker=0, so_upload_toi_da=0)
+    ma, _ = goi(f"{base_url}/uploads?name=diem.csv", "POST", CSV)
+    assert ma == 503
+    assert json.loads(goi(f"{base_url}/metrics")[1])["upload_tu_choi"] == 1
+
+
+def test_hang_doi_day_tra_503(chay_server):
+    # Không có worker nên job nằm lại trong hàng đợi (tối đa 1 job)
+    base_url = chay_server(so_worker=0, hang_doi_toi_da=1)
+    upload_id = tai_len(base_url)["upload_id"]
+
+    assert goi(f"{base_url}/jobs", "POST", cau_hinh(upload_id, 40))[0] == 202
+    ma, _ = goi(f"{base_url}/jobs", "POST", cau_hinh(upload_id, 50))
+    assert ma == 503
+    assert json.loads(goi(f"{base_url}/metrics")[1])["jobs_tu_choi"] == 1
+
+
+@pytest.mark.parametrize("body", [b"[1, 2]", b'"x"', b"{", '{"upload_id": "u", "cdr": [{"x": 1}]}'.encode()])
+def test_cau_hinh_sai_tra_400(chay_server, body):
+    base_url = chay_server(so_worker=0)
+    assert goi(f"{base_url}/jobs", "POST", body)[0] == 400
+
+
+@pytest.mark.parametrize("do_dai, ma", [(None, 411), ("-1", 400), ("abc", 400), ("1_0", 400),
+                                        (str(50 * 1024 * 1024 + 1), 413)])
+def test_content_length_sai(chay_server, do_dai, ma):
+    base_url = chay_server(so_worker=0)
+    conn = http.client.HTTPConnection(*base_url[len("http://"):].split(":"), timeout=10)
+    conn.putrequest("POST", "/uploads?name=diem.csv")
+    if do_dai is not None:
+        conn.putheader("Content-Length", do_dai)
+    conn.endheaders()
+    resp = conn.getresponse()
+    assert resp.status == ma
+    assert resp.getheader("Connection") == "close"
+    conn.close()
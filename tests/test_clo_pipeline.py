@@ -0,0 +1,226 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from clo_pipeline import (
+    LOAI_AF, anh_bieu_do_af, anh_bieu_do_ty_le, bang_khai_bao_cdr, du_lieu_bieu_do_af, du_lieu_bieu_do_ty_le,
+    gop_file_moi, histogram_cdr, kho_du_lieu_rong, kiem_tra_du_lieu, phan_loai_cdr, thong_ke_dat_cdr, tinh_plo,
+    xep_loai,
+)
+
+MAX_SCORES = {"Câu 1": 2.0, "Câu 2": 2.0}
+
+
+@pytest.fixture
+def df_diem():
+    # Câu 1: SV thứ 3 thiếu điểm; Câu 2: đủ điểm
+    return pd.DataFrame({
+        "Câu 1": [2.0, 1.0, np.nan, 0.0],
+        "Câu 2": [2.0, 2.0, 0.0, 0.0],
+    })
+
+
+def test_kiem_tra_du_lieu_cac_quy_tac():
+    df_in = pd.DataFrame({
+        "IDSV": [1, 2, 3],
+        "Câu 1": ["abc", -1.0, 3.0],
+        "Câu 2": [np.nan, 1.0, np.nan],
+        "Câu 3": [np.nan, 9.0, 1.0],
+    })
+    cdr_map = {"CĐR1": {"Câu hỏi": ["Câu 1", "Câu 2"]}}
+
+    df_diem, df_loi = kiem_tra_du_lieu(df_in, ["Câu 1", "Câu 2", "Câu 3"], {"Câu 1": 2.0, "Câu 2": 2.0, "Câu 3": 2.0},
+                                       cdr_map)
+
+    assert np.isnan(df_diem.loc[0, "Câu 1"])
+    # Ô trống không bị báo âm / vượt điểm tối đa; ô trống của câu không thuộc CĐR (Câu 3) không bị báo
+    assert sorted(df_loi[["IDSV", "Câu hỏi", "Quy tắc"]].itertuples(index=False, name=None)) == [
+        (1, "Câu 1", "Không phải số"),
+        (1, "Câu 2", "Thiếu điểm câu hỏi thuộc CĐR"),
+        (2, "Câu 1", "Điểm âm"),
+        (2, "Câu 3", "Vượt điểm tối đa"),
+        (3, "Câu 1", "Vượt điểm tối đa"),
+        (3, "Câu 2", "Thiếu điểm câu hỏi thuộc CĐR"),
+    ]
+
+
+def test_kiem_tra_du_lieu_chua_khai_bao_diem_toi_da():
+    df_in = pd.DataFrame({"IDSV": [1, 2], "Câu 1": [50.0, np.nan]})
+
+    _, df_loi = kiem_tra_du_lieu(df_in, ["Câu 1"], {"Câu 1": np.inf}, {})
+
+    assert df_loi.empty
+
+
+def test_thong_ke_dung_ty_le_ky_vong_cua_tung_cdr(df_diem):
+    # Hai CĐR cùng tỷ lệ SV đạt 50% nhưng tỷ lệ kỳ vọng khác nhau
+    df_cdr = bang_khai_bao_cdr([
+        {"Tên CĐR": "CĐR1", "Câu hỏi": ["Câu 2"], "Tỷ lệ điểm tối thiểu (%)": 50, "Tỷ lệ kỳ vọng (%)": 40},
+        {"Tên CĐR": "CĐR2", "Câu hỏi": ["Câu 2"], "Tỷ lệ điểm tối thiểu (%)": 50, "Tỷ lệ kỳ vọng (%)": 75},
+    ], MAX_SCORES)
+
+    df_thongke = thong_ke_dat_cdr(df_diem, df_cdr, MAX_SCORES, "zero")
+
+    assert df_thongke["Tỷ lệ SV đạt (%)"].tolist() == [50.0, 50.0]
+    assert df_thongke["Kết quả"].tolist() == ["ĐẠT ✅", "KHÔNG ĐẠT ❌"]
+
+
+@pytest.mark.parametrize("xu_ly_thieu, so_sv, loai, so_sv_dat", [
+    # Thiếu điểm tính là 0: điểm hệ 10 = [10, 5, 0, 0]
+    ("zero", 4, {"A": 1, "B": 0, "C": 0, "D": 1, "F": 2}, 2),
+    # Loại SV thiếu điểm: điểm hệ 10 = [10, 5, 0]
+    ("exclude", 3, {"A": 1, "B": 0, "C": 0, "D": 1, "F": 1}, 2),
+    # Thay bằng điểm TB của câu (1.0): điểm hệ 10 = [10, 5, 5, 0]
+    ("mean", 4, {"A": 1, "B": 0, "C": 0, "D": 2, "F": 1}, 3),
+])
+def test_phan_loai_theo_cach_xu_ly_thieu(df_diem, xu_ly_thieu, so_sv, loai, so_sv_dat):
+    df_cdr = bang_khai_bao_cdr([{"Tên CĐR": "CĐR1", "Câu hỏi": "Câu 1", "Tỷ lệ điểm tối thiểu (%)": 50}], MAX_SCORES)
+
+    df_phanloai, diem_sv = phan_loai_cdr(df_diem, df_cdr, MAX_SCORES, xu_ly_thieu)
+    df_thongke = thong_ke_dat_cdr(df_diem, df_cdr, MAX_SCORES, xu_ly_thieu)
+
+    dong = df_phanloai.iloc[0]
+    assert dong["Tổng số SV"] == so_sv
+    assert {k: dong[c] for k, c in zip("ABCDF", ["Loại A (Đạt)", "Loại B (Đạt)", "Loại C (Đạt)",
+                                                 "Loại D (Đạt)", "Loại F (Không đạt)"])} == loai
+    assert len(diem_sv[0][2]) == so_sv
+    assert df_thongke.loc[0, "Số SV được tính"] == so_sv
+    assert df_thongke.loc[0, "Tổng SV đạt"] == so_sv_dat
+
+
+def test_diem_vuot_10_khong_duoc_xep_loai():
+    df_diem = pd.DataFrame({"Câu 1": [3.0, 2.0]})
+    df_cdr = bang_khai_bao_cdr([{"Tên CĐR": "CĐR1", "Câu hỏi": "Câu 1"}], MAX_SCORES)
+
+    df_phanloai, diem_sv = phan_loai_cdr(df_diem, df_cdr, MAX_SCORES, "zero")
+
+    assert [xep_loai(v) for v in diem_sv[0][2]] == ["-", "A"]
+    assert df_phanloai.loc[0, "Loại A (Đạt)"] == 1
+    assert xep_loai(np.nan) == "-"
+
+
+def file_diem(ten, idsv, cau_1, **cot_khac):
+    return pd.DataFrame({"Tên học phần": "Kinh tế vi mô", "IDSV": idsv, "Câu 1": cau_1, **cot_khac,
+                         "File nguồn": ten})
+
+
+def gop(*ds_file):
+    kho = kho_du_lieu_rong()
+    for i, df in enumerate(ds_file):
+        kho = gop_file_moi(kho, df, f"ma{i}")
+    return kho, pd.concat(kho["trung"], ignore_index=True) if kho["trung"] else pd.DataFrame()
+
+
+def test_gop_bo_ban_ghi_trung_giua_hai_file():
+    kho, df_trung = gop(file_diem("a.xlsx", [1, 2], [1.0, 2.0]), file_diem("b.xlsx", [2, 3], [2.0, 3.0]))
+
+    assert kho["df"]["IDSV"].tolist() == [1, 2, 3]
+    assert df_trung[["IDSV", "File giữ lại", "File bị bỏ qua"]].values.tolist() == [["2", "a.xlsx", "b.xlsx"]]
+    assert not df_trung["Mâu thuẫn điểm"].any()
+
+
+def test_gop_bo_ban_ghi_trung_trong_cung_file():
+    kho, df_trung = gop(file_diem("a.xlsx", [1, 1, 2], [1.0, 5.0, 2.0]))
+
+    assert kho["df"]["Câu 1"].tolist() == [1.0, 2.0]
+    assert df_trung["Mâu thuẫn điểm"].tolist() == [True]
+
+
+def test_gop_idsv_so_thuc_va_chuoi_la_cung_khoa():
+    # Excel đọc IDSV thành 101340.0, CSV đọc thành chuỗi '101340'
+    kho, df_trung = gop(file_diem("a.xlsx", [101340.0], [1.0]), file_diem("b.csv", ["101340"], [1.0]))
+
+    assert len(kho["df"]) == 1
+    assert df_trung["IDSV"].tolist() == ["101340"]
+
+
+def test_gop_giu_dong_khong_co_idsv():
+    khong_cot_idsv = pd.DataFrame({"Tên học phần": ["Kinh tế vi mô"] * 2, "Câu 1": [1.0, 1.0], "File nguồn": "c.csv"})
+    kho, df_trung = gop(file_diem("a.xlsx", [1, np.nan, np.nan], [1.0, 2.0, 2.0]), khong_cot_idsv)
+
+    assert len(kho["df"]) == 5
+    assert df_trung.empty
+
+
+def test_gop_mau_thuan_diem_co_sai_so_va_cot_thieu():
+    # Sai số làm tròn sau khi qua CSV và cột chỉ có ở file sau không tính là mâu thuẫn
+    a = file_diem("a.xlsx", [1, 2], [0.1 + 0.2, 1.0])
+    b = file_diem("b.csv", [1, 2], [0.3, 1.5], **{"Câu 3": [7.0, 7.0]})
+    _, df_trung = gop(a, b)
+
+    assert df_trung["Mâu thuẫn điểm"].tolist() == [False, True]
+
+
+def test_gop_cot_cua_file_theo_noi_dung_khong_theo_ten():
+    # Hai file khác nhau cùng tên 'a.xlsx'; bản ghi được giữ thuộc file không có 'Câu 3'
+    a1 = file_diem("a.xlsx", [1], [1.0])
+    a2 = file_diem("a.xlsx", [2], [1.0], **{"Câu 3": [5.0]})
+    b = file_diem("b.xlsx", [1], [1.0], **{"Câu 3": [7.0]})
+    _, df_trung = gop(a1, a2, b)
+
+    assert df_trung["Mâu thuẫn điểm"].tolist() == [False]
+
+
+# --- Tổng hợp PLO ---
+COT_MAP = ["Học phần", "CĐR", "PLO", "Trọng số"]
+
+
+def test_plo_trung_binh_co_trong_so_tren_cdr_co_diem():
+    diem_cdr_hp = {
+        "Kinh tế vi mô": pd.DataFrame({"CĐR1": [8.0, 6.0], "CĐR2": [4.0, np.nan]}, index=["1", "2"]),
+        "Toán": pd.DataFrame({"CĐR1": [2.0]}, index=["3"]),
+    }
+    df_map = pd.DataFrame([("Kinh tế vi mô", "CĐR1", "PLO1", 1), ("Kinh tế vi mô", "CĐR2", "PLO1", 3),
+                           ("Toán", "CĐR1", "PLO2", 1)], columns=COT_MAP)
+    df_plo_sv, df_plo = tinh_plo(diem_cdr_hp, df_map)
+
+    # SV 1: (8*1 + 4*3) / 4; SV 2 thiếu CĐR2 nên chỉ tính CĐR1; SV 3 không có điểm PLO1
+    assert df_plo_sv.loc["1", "PLO1"] == pytest.approx(5.0)
+    assert df_plo_sv.loc["2", "PLO1"] == pytest.approx(6.0)
+    assert np.isnan(df_plo_sv.loc["3", "PLO1"]) and df_plo_sv.loc["3", "PLO2"] == 2.0
+    dong = df_plo.set_index("PLO")
+    assert dong.loc["PLO1", "Số SV"] == 2 and dong.loc["PLO1", "Số học phần"] == 1
+    assert dong.loc["PLO2", "Tỷ lệ SV đạt (%)"] == 0.0
+
+
+def test_plo_ten_hoc_phan_dang_so():
+    diem_cdr_hp = {101: pd.DataFrame({"CĐR1": [7.0]}, index=["1"])}
+    df_map = pd.DataFrame([("101", "CĐR1", "PLO1", 1)], columns=COT_MAP)
+    df_plo_sv, _ = tinh_plo(diem_cdr_hp, df_map)
+    assert df_plo_sv.loc["1", "PLO1"] == 7.0
+
+    # Bảng liên kết đọc từ file có thể cho tên học phần dạng số
+    df_plo_sv, _ = tinh_plo({"101": diem_cdr_hp[101]}, df_map.assign(**{"Học phần": [101]}))
+    assert df_plo_sv.loc["1", "PLO1"] == 7.0
+
+
+def test_plo_bang_lien_ket_rong():
+    diem_cdr_hp = {"Toán": pd.DataFrame({"CĐR1": [7.0]}, index=["1"])}
+    df_plo_sv, df_plo = tinh_plo(diem_cdr_hp, pd.DataFrame(columns=COT_MAP))
+    assert df_plo.empty and df_plo_sv.shape == (1, 0)
+
+
+# --- Dữ liệu biểu đồ ---
+def test_histogram_cdr_gom_khoang_va_cat_diem_vuot_10():
+    qd = pd.Series([0.0, 0.5, 4.0, 9.99, 10.0, 12.5, np.nan])
+    (kq,) = histogram_cdr([("CĐR1", None, qd, 2.0)], so_khoang=5)
+    assert kq["cdr"] == "CĐR1"
+    assert kq["bien"] == [0.0, 2.0, 4.0, 6.0, 8.0, 10.0]
+    # 10 và 12.5 (bị cắt về 10) nằm ở khoảng cuối; NaN không được đếm
+    assert kq["so_sv"] == [2, 0, 1, 0, 3]
+
+
+def test_du_lieu_bieu_do_cdr_khong_co_cau_hoi():
+    df = pd.DataFrame({"Câu 1": [2.0, 1.0, 0.0]})
+    df_cdr = bang_khai_bao_cdr([{"Tên CĐR": "CĐR1", "Câu hỏi": ["Câu 1"]},
+                                {"Tên CĐR": "CĐR2", "Câu hỏi": [], "Tỷ lệ kỳ vọng (%)": 60}], {"Câu 1": 2.0})
+    bd = du_lieu_bieu_do_ty_le(thong_ke_dat_cdr(df, df_cdr, {"Câu 1": 2.0}, "zero"), df_cdr)
+    assert bd == {"cdr": ["CĐR1", "CĐR2"], "ty_le_dat": [pytest.approx(66.67), None], "ky_vong": [75.0, 60.0]}
+
+    bd_af = du_lieu_bieu_do_af(phan_loai_cdr(df, df_cdr, {"Câu 1": 2.0}, "zero")[0])
+    assert list(bd_af) == ["cdr", *LOAI_AF]
+    assert bd_af["cdr"] == ["CĐR1", "CĐR2"] and all(len(bd_af[loai]) == 2 for loai in LOAI_AF)
+
+    # Ảnh cho báo cáo Word vẫn vẽ được khi có CĐR không có tỷ lệ đạt
+    assert anh_bieu_do_ty_le(bd, "Kinh tế vi mô").startswith(b"\x89PNG")
+    assert anh_bieu_do_af(bd_af, "Kinh tế vi mô").startswith(b"\x89PNG")